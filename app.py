@@ -1,13 +1,39 @@
-import os, re
+import os, re, copy, hmac, time, atexit, hashlib, logging, threading, tracemalloc
 import dash
+import click
+import diskcache
 import pandas as pd
 import numpy as np
-from dash import dcc, html, Input, Output, State
+from dash import dcc, html, dash_table, Input, Output, State, MATCH
+from dash.exceptions import PreventUpdate
+from flask import jsonify, abort, redirect, request, g, Response, stream_with_context, send_file, has_request_context
+from urllib.parse import urlencode, parse_qs
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+""" Logging and tracing of the allocations for the memory diagnostics, set up before the
+other modules of the application are imported, as they load the dataset. Messages of the
+application go to stderr; those of the server (e.g. gunicorn) keep their own handlers."""
+from apps import settings
+logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logging.getLogger('apps').setLevel(settings.LOG_LEVEL)
+logging.getLogger(__name__).setLevel(settings.LOG_LEVEL)
+if settings.MEMORY_DIAGNOSTICS:
+    tracemalloc.start()
 
 from apps import glossary, lists, submit
-from apps.lists import doi_to_url
+from apps.schema import DATA_PATH, load_data, compact, doi_to_url
+from apps.importer import Importer, append_csv, csv_columns
 from apps.sunburst import appObj
+from apps.upset import intersection_counts
+from apps.query import Database
+from apps.cache import memoize
+from apps import export, metrics, warmup, memory
+from apps.images import ImageCache, FORMATS as IMAGE_FORMATS
+from apps.admission import AdmissionControl
+from apps.locking import SharedLock
+from apps.responses import ResponseCache, request_key
 
 """
 After downloading this repository, run this file.
@@ -25,41 +51,424 @@ Next steps:
 - Export local functions to external file (too many rows in the app)
 """
 
-""" Accessing the csv located in repo, importing it to a pandas dataframe."""
-data = pd.read_csv(os.path.join(os.getcwd(), 'data', 'installationsList.csv'))
+""" Accessing the csv located in repo, importing it to a compact pandas dataframe,
+and compiling the sunburst objects and the live snapshot of the dataset: tag matrix,
+field posting lists and reverse index from each installation to the nodes of its tags,
+updated when installations are appended. Queries go through apps.query, shared with batch jobs."""
+db = Database()
+data, snapshot = db.data, db.snapshot
+AI, IN, SD = db.objs['AI'], db.objs['IN'], db.objs['SD']
+
+labellist, IDlist, parentlist = db.labels, db.ids, db.parents #+ FI.labels[13:]
 
-""" Defining the sunburst objects."""
-AI = appObj(data, 'Artistic Intention')
-SD = appObj(data, 'System Design')
-IN = appObj(data, 'Interaction')
-FI = appObj(data, 'Field')
+snapshot.fit_embedding(settings.EMBEDDING_METHOD)
+snapshot.duplicates.threshold = settings.DUPLICATE_THRESHOLD
 
-""" Initiate respective sunburst arrays."""
-AI.initiate_arrays()
-SD.initiate_arrays()
-IN.initiate_arrays()
-FI.initiate_arrays()
+""" Lock of the snapshot, the sunburst objects, the caches and the list of installations:
+requests hold it in shared mode until their view returns, streamed responses reading
+a view of the snapshot afterwards, while installations are appended or the csv reloaded
+holding it exclusively, as those change the live structures in place."""
+data_lock = SharedLock()
 
-labellist = AI.labels[12:] + IN.labels[7:] + SD.labels[18:] #+ FI.labels[13:]
-IDlist = AI.df['ids'][12:].tolist() + IN.df['ids'][7:].tolist() + SD.df['ids'][18:].tolist() #+ FI.labels[13:]
-parentlist = AI.parentslabels[12:] + IN.parentslabels[7:] + SD.parentslabels[18:] #+ FI.parents[13:]
+""" Glossary terms tied to taxonomy nodes that no longer exist."""
+untied = glossary.untied(set(AI.IDs + IN.IDs + SD.IDs + snapshot.tagcols))
+if untied:
+    logging.getLogger(__name__).warning('Glossary terms tied to unknown taxonomy IDs: %s', ', '.join(untied))
 
 """ Import external CSS style sheet. 
 Note than CSS files in /asset subfolder are automaticaly imported.
 
 """
 
+""" Background callbacks run in a pool of local processes, their jobs and results being
+kept in a disk cache: results are reused across users for identical inputs and dataset version."""
+background_manager = dash.DiskcacheManager(
+    diskcache.Cache(os.path.join(settings.CACHE_DIR, 'background')),
+    cache_by=[lambda: snapshot.version],
+    expire=settings.BACKGROUND_EXPIRE)
+
+""" Static images of the sunbursts, rendered in a pool of processes and kept on disk
+per dataset version, downloaded from /images/<dimension>.<format>. The processes are
+forked now, before the threads of the server start, and the images of the previous
+versions deleted when the dataset changes."""
+images = ImageCache(settings.IMAGE_DIR, settings.IMAGE_WORKERS)
+images.start()
+
 """ Initiate the dash application """
 app = dash.Dash(__name__, 
+    background_callback_manager=background_manager,
     suppress_callback_exceptions=True,
     title='ISI Database',
     update_title='Loading...')
 server = app.server
 
 """ Local functions """
-def make_list(values, plotType):
-    """Creates a html list containing publications belonging
-    to the input categories.
+def to_sections(values):
+    """ Converts categories, as labelled in the dropdown menu and the sunburst,
+    into the corresponding tag columns. Fields are returned unchanged.
+
+    Parameters
+    ----------
+    values : list
+        Category or categories selected.
+    """
+    return db.sections(values)
+
+def select_rows(values, rows=slice(None), years=None):
+    """ Returns a boolean mask of the installations belonging to
+    every input category.
+
+    Parameters
+    ----------
+    values : list
+        Category or categories selected.
+    rows : slice
+        Contiguous range of installations to consider, all of them by default.
+    years : tuple, optional
+        First and last year of the installations to consider.
+    """
+    return db.select(values, rows, years)
+
+@memoize(maxsize=256)
+def selected_rows(key, years):
+    """ Returns the positions of the installations belonging to every section of the key.
+    Identical selections, whether from the application, a shared url or an export,
+    share the same cached result.
+
+    Parameters
+    ----------
+    key : tuple
+        Sorted tag columns or fields of the selection.
+    years : tuple
+        First and last year of the selection, None for all years.
+    """
+    return db.rows(list(key), years)
+
+def year_filter(year_range):
+    """ Returns the first and last year of a year range, None when it covers every
+    known year: the installations of unknown year are only left out by narrower ranges.
+
+    Parameters
+    ----------
+    year_range : list
+        First and last year selected.
+    """
+    years = snapshot.cube.years
+    if year_range and len(years) and (int(year_range[0]) > years[0] or int(year_range[1]) < years[-1]):
+        return (int(year_range[0]), int(year_range[1]))
+    return None
+
+def selection_query(plotType, values, years):
+    """ Encodes a selection as the canonical query string of the url:
+    the same selection always gives the same query string.
+
+    Parameters
+    ----------
+    plotType : str
+        Type of sunburst selected.
+    values : list
+        Categories selected.
+    years : tuple
+        First and last year selected, None for all years.
+    """
+    params = [('dim', plotType)] + [('category', value) for value in sorted(set(values))]
+    if years is not None:
+        params += [('year_from', years[0]), ('year_to', years[1])]
+    return '?' + urlencode(params)
+
+def parse_selection(params):
+    """ Decodes a selection from the parameters of a query string,
+    ignoring the values that are not valid and year ranges covering every known year.
+
+    Parameters
+    ----------
+    params : dict
+        Lists of values by parameter, as returned by urllib.parse.parse_qs.
+    """
+    plotType = params.get('dim', ['AI'])[0]
+    if plotType not in ('AI', 'IN', 'SD'):
+        plotType = 'AI'
+    values = sorted(set(params.get('category', [])))
+    try:
+        years = year_filter((int(params['year_from'][0]), int(params['year_to'][0])))
+    except (KeyError, ValueError):
+        years = None
+    return plotType, values, years
+
+""" Counts of the selections made by the users, replayed by the warm-up."""
+selections = warmup.SelectionLog(settings.ACCESS_LOG, settings.ACCESS_LOG_SIZE)
+
+""" Side effects of the callbacks by name, replayed when their response is served
+from the response cache."""
+EFFECTS = {'selection': selections.record, 'metric': metrics.increment}
+
+def side_effect(name, *args):
+    """ Runs a side effect of a callback, recording it with the response stored
+    in the response cache.
+
+    Parameters
+    ----------
+    name : str
+        Name of the side effect in EFFECTS.
+    args : list
+        Arguments of the side effect.
+    """
+    EFFECTS[name](*args)
+    if has_request_context() and 'effects' in g:
+        g.effects.append((name, args))
+
+def selection_values(clickData, values, plotType):
+    """ Returns the categories of the dropdown menu, with the segment clicked
+    on the sunburst when it is a category.
+
+    Parameters
+    ----------
+    clickData : dict
+        Data about the sunburst's clicked section.
+    values : list
+        Selected data from the dropdown list.
+    plotType : str
+        Type of sunburst selected.
+    """
+    values = list(values or [])
+    if not (clickData is None or (len(clickData['points'][0]['id']) <= 6 and plotType != 'FI') or clickData['points'][0]['id'] in parentlist):
+        values.append(clickData['points'][0]['label'])
+    return values
+
+@memoize(maxsize=256)
+def tag_counts(key):
+    """ Counts the installations of each tag among the ones belonging
+    to the filter categories, read from the facet counts.
+
+    Parameters
+    ----------
+    key : tuple
+        Sorted categories of the active filter.
+    """
+    return db.tag_counts(list(key))
+
+@memoize(maxsize=256)
+def filtered_frame(plotType, key):
+    """ Returns the sunburst dataframe of a dimension with node values
+    recomputed for the installations belonging to the filter categories.
+    Nodes without any installation are left out.
+
+    Parameters
+    ----------
+    plotType : str
+        Type of Sunburst plot.
+    key : tuple
+        Sorted categories of the active filter.
+    """
+    return db.sunburst(plotType, counts=tag_counts(key))
+
+@memoize(maxsize=1)
+def field_sunburst(version):
+    """ Returns the sunburst object of the subject areas and fields (appObj), built
+    from the installations on first use and again for each version of the dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version of the snapshot.
+    """
+    obj = appObj(snapshot.data, 'Field')
+    obj.initiate_arrays()
+    return obj
+
+@memoize(maxsize=64)
+def group_intersections(group):
+    """ Returns the non-empty intersections between the sub-categories of a category,
+    computed over the packed tag signatures of the installations.
+
+    Parameters
+    ----------
+    group : str
+        ID of the category.
+    """
+    obj = [o for o in (AI, IN, SD) if group in o.IDs][0]
+    cols = obj.descendants(group)
+    return obj, cols, intersection_counts(snapshot.tags[:, [snapshot.tagindex[c] for c in cols]], cols)
+
+def upset_figure(group, n_max=40):
+    """ Creates an UpSet plot of the intersections between the sub-categories of a category.
+    The top chart shows the number of installations of each intersection,
+    the dot matrix below indicates which sub-categories are part of it.
+
+    Parameters
+    ----------
+    group : str
+        ID of the category.
+    n_max : int
+        Maximum number of intersections displayed.
+    """
+    obj, cols, intersections = group_intersections(group)
+    intersections = intersections[:n_max]
+    names = dict(zip(obj.df['ids'], obj.df['labels']))
+    ylabels = [re.sub('<br>', ' ', names[c]) for c in cols]
+    color = {'AI': '#9C2457', 'SD': '#006027', 'IN': '#1852A4'}[
+        {AI.name: 'AI', SD.name: 'SD', IN.name: 'IN'}[obj.name]]
+
+    xs, ys, lx, ly = [], [], [], []
+    for x, (members, count) in enumerate(intersections):
+        rows = sorted(cols.index(m) for m in members)
+        xs += [x] * len(rows)
+        ys += rows
+        lx += [x, x, None]
+        ly += [rows[0], rows[-1], None]
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+        row_heights=[0.6, 0.4], vertical_spacing=0.02)
+    fig.add_trace(go.Bar(
+        x=list(range(len(intersections))),
+        y=[count for members, count in intersections],
+        marker_color=color,
+        hovertemplate='%{y} installations<extra></extra>'
+        ), row=1, col=1)
+    fig.add_trace(go.Scatter(
+        x=[x for x in range(len(intersections)) for c in cols],
+        y=[y for x in range(len(intersections)) for y in range(len(cols))],
+        mode='markers', marker=dict(color='#DDDDDD', size=10),
+        hoverinfo='skip'
+        ), row=2, col=1)
+    fig.add_trace(go.Scatter(x=lx, y=ly, mode='lines',
+        line=dict(color=color, width=2), hoverinfo='skip'), row=2, col=1)
+    fig.add_trace(go.Scatter(x=xs, y=ys, mode='markers',
+        marker=dict(color=color, size=10), hoverinfo='skip'), row=2, col=1)
+    fig.update_xaxes(visible=False)
+    fig.update_yaxes(tickvals=list(range(len(cols))), ticktext=ylabels,
+        autorange='reversed', row=2, col=1)
+    fig.update_layout(showlegend=False,
+                    margin=dict(t=20, l=50, r=20, b=20),
+                    font=dict(family='Roboto', size=14),
+                    height=400 + 25 * len(cols),
+                    paper_bgcolor='rgba(0, 0, 0, 0)',
+                    plot_bgcolor='rgba(0, 0, 0, 0)')
+    return fig
+
+def map_figure(mask, highlight=None):
+    """ Creates the map of the installations, placed by the 2D projection of their tags.
+    The installations outside the selection are greyed out.
+
+    Parameters
+    ----------
+    mask : numpy array
+        Boolean mask of the selected installations.
+    highlight : int, optional
+        ID of an installation to emphasize.
+    """
+    coords = snapshot.coords
+    names = snapshot.data['Name'].to_numpy()
+    ids = snapshot.ids
+
+    fig = go.Figure()
+    for selected, color in [(False, '#DDDDDD'), (True, '#9C2457')]:
+        rows = np.flatnonzero(mask == selected)
+        fig.add_trace(go.Scattergl(
+            x=coords[rows, 0], y=coords[rows, 1],
+            customdata=ids[rows], text=names[rows],
+            mode='markers', marker=dict(color=color, size=9, line=dict(color='white', width=0.5)),
+            hovertemplate='%{text}<extra></extra>'))
+    if highlight in snapshot.rowof:
+        x, y = coords[snapshot.rowof[highlight]]
+        fig.add_trace(go.Scatter(x=[x], y=[y], mode='markers', hoverinfo='skip',
+            marker=dict(color='rgba(0, 0, 0, 0)', size=18, line=dict(color='black', width=2))))
+    fig.update_xaxes(visible=False)
+    fig.update_yaxes(visible=False, scaleanchor='x')
+    fig.update_layout(showlegend=False,
+                    margin=dict(t=20, l=20, r=20, b=20),
+                    font=dict(family='Roboto', size=14),
+                    height=600,
+                    clickmode='event',
+                    paper_bgcolor='rgba(0, 0, 0, 0)',
+                    plot_bgcolor='rgba(0, 0, 0, 0)')
+    return fig
+
+def trends_figure(values):
+    """ Creates the chart of the share of the installations of each year
+    carrying the input categories, read from the year by tag cube.
+    Without category, shows the number of installations of each year.
+
+    Parameters
+    ----------
+    values : list
+        Categories selected.
+    """
+    cube = snapshot.cube
+    fig = go.Figure()
+    if not values:
+        fig.add_trace(go.Bar(x=cube.years, y=cube.totals, marker_color='#9C2457',
+            hovertemplate='%{x}: %{y} installations<extra></extra>'))
+    for value, col in zip(values, to_sections(values)):
+        if col in snapshot.tagindex:
+            fig.add_trace(go.Scatter(x=cube.years, y=cube.shares(snapshot.tagindex[col]),
+                mode='lines+markers', name=re.sub('<br>', ' ', value),
+                hovertemplate='%{x}: %{y:.0%}<extra></extra>'))
+    fig.update_yaxes(tickformat='.0%' if values else None, gridcolor='#EBEBEB')
+    fig.update_layout(margin=dict(t=20, l=50, r=20, b=40),
+                    font=dict(family='Roboto', size=14),
+                    height=500,
+                    legend=dict(orientation='h', y=-0.15),
+                    paper_bgcolor='rgba(0, 0, 0, 0)',
+                    plot_bgcolor='rgba(0, 0, 0, 0)')
+    return fig
+
+def dropdown_options(counts=None):
+    """ Returns the options of the category dropdown menus, labelled with
+    the number of installations of each tag category when counts are given.
+
+    Parameters
+    ----------
+    counts : numpy array, optional
+        Facet counts, as returned by snapshot.facets.counts.
+    """
+    options = []
+    for i in range(0, len(labellist)):
+        label = re.sub('<br>', ' ', parentlist[i]) + ' | ' + re.sub('<br>', ' ', labellist[i])
+        if counts is not None and ('Tag', IDlist[i]) in snapshot.facets.columns:
+            label += ' (' + str(counts[snapshot.facets.columns[('Tag', IDlist[i])]]) + ')'
+        options.append({'label': label, 'value': labellist[i]})
+    return options
+
+def facet_panel(counts, n_max=8):
+    """ Creates the html summary of the publications, types, sources and decades
+    of the listed installations, most frequent first.
+
+    Parameters
+    ----------
+    counts : numpy array
+        Facet counts, as returned by snapshot.facets.counts.
+    n_max : int
+        Maximum number of values displayed per facet.
+    """
+    values = {}
+    for (facet, value), count in zip(snapshot.facets.facets, counts):
+        if facet != 'Tag' and count > 0:
+            values.setdefault(facet, []).append((count, value))
+    return [
+        html.P([html.B(facet + ': '), ', '.join('{} ({})'.format(value, count)
+            for count, value in sorted(values[facet], key=lambda v: (-v[0], v[1]))[:n_max])])
+        for facet in ['Publication', 'Type', 'Source', 'Year'] if facet in values
+    ]
+
+def markdown_link(text, url):
+    """ Formats a link for the markdown cells of the results table,
+    escaping the characters that would break the link syntax.
+
+    Parameters
+    ----------
+    text : str
+        Text of the link.
+    url : str
+        Target of the link.
+    """
+    text = re.sub(r'([\[\]])', r'\\\1', text)
+    url = url.replace(' ', '%20').replace('(', '%28').replace(')', '%29')
+    return '[' + text + '](' + url + ')'
+
+def make_list(values, plotType, years=None):
+    """Creates the records of the installations belonging
+    to the input categories, displayed in the results table.
 
     Parameters
     ----------
@@ -67,48 +476,219 @@ def make_list(values, plotType):
         Category or categories selected.
     plotType : str
         Type of Sunburst plot. 
+    years : tuple, optional
+        First and last year of the installations listed.
     """
+    return to_records(snapshot.take(selected_rows(tuple(sorted(set(to_sections(values)))), years)))
 
-    sections = []
-    rows = []
-  
-    for value in values:
-        try:
-            section = IDlist[labellist.index(value)]
-            sections.append(section)
-        except ValueError:
-            sections.append(value)
-
-    for i in range(0, len(data)):
-        verif = np.zeros(len(sections))
-        for s in range(0, len(sections)):
-            field = str(data.iloc[i]['Field']).split('; ')
-            for f in range(0, len(field)):
-                if re.sub(' ', '<br>', field[f]) == sections[s]:
-                    verif[s] = 1
-                else:
-                    continue 
-            try:                           
-                if data.iloc[i][sections[s]] == 1:
-                    verif[s] = 1
-                elif data.iloc[i][sections[s]] != 1:
-                    continue
-            except KeyError:
-                continue
-
-        if 0 not in verif:              
-            row = []
-            for col2 in data.columns[[3, 2, 6, 5]]:
-                value = data.iloc[i][col2]
-                if col2 == 'Hyperlink':
-                    cell = html.Td(html.A(href=doi_to_url(value), children=data.iloc[i][1], target='_blank',
-                    className='link_list'))                    
-                else:
-                    cell = html.Td(value)
-                row.append(cell)
-            rows.append(html.Tr(row))
+def to_records(results):
+    """ Converts installations into the records of the results table.
+
+    Parameters
+    ----------
+    results : pandas dataframe
+        Installations, with the columns of the csv.
+    """
+    return [
+        {
+        'id': int(ID),
+        'Name': markdown_link(name, doi_to_url(link)),
+        'Creator(s)': creators,
+        'Year': year,
+        'Source': publication
+        } for ID, name, creators, year, publication, link in zip(results['ID'], results['Name'],
+            results['Creator(s)'], results['Year'], results['Publication'], results['Hyperlink'])
+    ]
+
+def export_query(values, years=None):
+    """ Returns the query string of the export of the installations belonging
+    to the input categories, as read by /export and the download job.
+
+    Parameters
+    ----------
+    values : list
+        Category or categories selected.
+    years : tuple, optional
+        First and last year of the installations downloaded.
+    """
+    params = [('category', value) for value in sorted(set(values))]
+    if years is not None:
+        params += [('year_from', years[0]), ('year_to', years[1])]
+    return '?' + urlencode(params)
+
+def installation_name(ID):
+    """ Returns the name of an installation.
+
+    Parameters
+    ----------
+    ID : int
+        ID of the installation.
+    """
+    return snapshot.record(ID)['Name']
+
+@memoize(maxsize=1024)
+def similar_installations(ID, k, metric, version):
+    """ Returns the IDs and scores of the k installations most similar to an installation,
+    computed on demand and cached by dataset version.
+
+    Parameters
+    ----------
+    ID : int
+        ID of the installation.
+    k : int
+        Number of similar installations.
+    metric : str
+        'jaccard' or 'cosine'.
+    version : str
+        Version of the snapshot.
+    """
+    return snapshot.most_similar(ID, k, metric)
+
+def append_installations(new, force=False, path=None):
+    """ Adds installations to the csv and the live snapshot, and updates the derived state
+    in proportion to the number of new installations: tag matrix, sunburst values,
+    field posting lists, reverse index, list of installations and caches.
+    Cached results are kept when none of the new installations matches their filter.
+    Raises a ValueError, before anything is written, when new installations are
+    already in the database or likely duplicates of existing ones or of each other.
+    Holds the data lock exclusively, so the calling request must have released it.
+
+    Parameters
+    ----------
+    new : pandas dataframe
+        Validated and compacted installations, with the columns of the csv.
+    force : bool
+        Whether likely duplicates are added anyway.
+    path : str, optional
+        Path of the csv the installations are appended to, None to only add them to the snapshot.
+    """
+    with data_lock.writing():
+        existing = set(new['ID'].astype(int)) & set(snapshot.rowof)
+        if existing:
+            raise ValueError('Installations already in the database: ' + ', '.join(map(str, sorted(existing))))
+        if not force:
+            duplicates = snapshot.find_duplicates(new)
+            if duplicates:
+                raise ValueError('Likely duplicates: ' + '; '.join(
+                    str(new['ID'].iloc[i]) + ' of ' + ', '.join(str(match['ID']) for match in matches)
+                    for i, matches in duplicates.items()))
+        if path is not None:
+            append_csv(path, new, csv_columns(path))
+            if path == DATA_PATH:
+                reloading['mtime'] = os.path.getmtime(path)  # already in the snapshot
+        rows = snapshot.append(new)
+        appended(rows)
+    images.prune(snapshot.version)
     return rows
 
+def appended(rows):
+    """ Updates the caches and the list of installations for installations
+    appended to the snapshot.
+
+    Parameters
+    ----------
+    rows : slice
+        Positions of the appended installations.
+    """
+    tags = snapshot.tags[rows]
+
+    def update_counts(args, counts):
+        mask = select_rows(list(args[0]), rows)
+        if mask.any():
+            return counts + tags.sum(axis=0, where=mask[:, np.newaxis], dtype=np.int64)
+        return counts
+
+    def outdated(plotType, key):
+        return select_rows(list(key), rows).any()
+
+    def update_rows(args, positions):
+        return np.concatenate([positions, rows.start + np.flatnonzero(snapshot.select(list(args[0]), rows, args[1]))])
+
+    def touched(group):
+        obj = [o for o in (AI, IN, SD) if group in o.IDs][0]
+        return tags[:, [snapshot.tagindex[c] for c in obj.descendants(group)]].any()
+
+    tag_counts.update(update_counts)
+    selected_rows.update(update_rows)
+    filtered_frame.invalidate(outdated)
+    group_intersections.invalidate(touched)
+    lists.append_rows(snapshot.take(np.arange(rows.start, rows.stop)))
+
+def update_installations(data):
+    """ Brings the live snapshot to a new version of the csv. Only the installations
+    whose row hash changed are recomputed: their rows in the derived structures and
+    in the list of installations, and the cached results they contribute to, before
+    or after the change. Other cached selections are kept, their positions being
+    moved when installations are removed. Returns the changes, also recorded in the
+    changelog of the snapshot. Must be called holding the data lock exclusively.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Validated and compacted installations, with the columns of the csv.
+    """
+    changes = snapshot.diff(data)
+    if not (changes['added'] or changes['changed'] or changes['removed']):
+        return changes
+
+    def stale_entries(positions):
+        """ Cache entries that the installations at the input positions contribute to."""
+        tags = snapshot.tags[positions]
+        groups = {args for args, result in group_intersections.items() if tags[:, [snapshot.tagindex[c]
+            for c in [o for o in (AI, IN, SD) if args[0] in o.IDs][0].descendants(args[0])]].any()}
+        keys = {args for args, result in tag_counts.items() if select_rows(list(args[0]))[positions].any()}
+        keys |= {args[1:] for args, result in filtered_frame.items() if select_rows(list(args[1]))[positions].any()}
+        rows = {args for args, result in selected_rows.items() if snapshot.select(list(args[0]), years=args[1])[positions].any()}
+        return groups, keys, rows
+
+    outdated = np.array(sorted(snapshot.rowof[ID] for ID in changes['changed'] + changes['removed']), dtype=np.int64)
+    groups, keys, rows = stale_entries(outdated)
+    changes = snapshot.update(data, changes)
+    after = stale_entries(changes['positions'])
+    groups, keys, rows = groups | after[0], keys | after[1], rows | after[2]
+
+    group_intersections.invalidate(lambda group: (group,) in groups)
+    tag_counts.invalidate(lambda key: (key,) in keys)
+    filtered_frame.invalidate(lambda plotType, key: (key,) in keys)
+    selected_rows.invalidate(lambda key, years: (key, years) in rows)
+    if changes['moved'] is not None:
+        moved = changes['moved']
+        selected_rows.update(lambda args, positions: moved[positions][moved[positions] >= 0])
+        lists.remove_rows(np.flatnonzero(moved < 0))
+    if len(changes['positions']) > 0:
+        lists.replace_rows(changes['positions'], snapshot.take(changes['positions']))
+    if changes['added']:
+        appended(changes['rows'])
+    return changes
+
+def installation_detail(ID):
+    """ Creates a html summary of the tags associated with an installation,
+    grouped by dimension and category.
+
+    Parameters
+    ----------
+    ID : int
+        ID of the installation.
+    """
+    name = installation_name(ID)
+    dims = {}
+    for dimension, category, label, col in snapshot.tagsof[ID]:
+        dims.setdefault(dimension, {}).setdefault(category, []).append(label)
+
+    return html.Div([
+        html.H5(name),
+        html.Table([
+            html.Tr([html.Td(dimension), html.Td(category), html.Td(', '.join(labels))])
+            for dimension, categories in dims.items()
+            for category, labels in categories.items()
+        ]),
+        html.H6('Similar installations'),
+        html.Table([
+            html.Tr([html.Td(installation_name(similar)), html.Td('{:.0%} of tags in common'.format(score))])
+            for similar, score in similar_installations(ID, 5, 'jaccard', snapshot.version)
+        ])
+    ])
+
 """ Application layout."""
 # Index layout
 app.layout = html.Div(className="app_layout",
@@ -144,6 +724,12 @@ layout_main = html.Div([
         dcc.Link('GLOSSARY', href='/glossary', className='banner_link'),
         html.P(style={'paddingBottom': '0.5cm'}), 
         dcc.Link('LIST OF INSTALLATIONS', href='/lists', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('INTERSECTIONS', href='/intersections', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('MAP', href='/map', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('TRENDS', href='/trends', className='banner_link'),
 #        dcc.Link('SUBMIT INSTALLATION', href='/submit', className='banner_button'),
     ]), 
             
@@ -167,7 +753,12 @@ layout_main = html.Div([
                         value='AI', # Initial Sunburst: Artistic Intention
                         className='radiobutton-group',
                         ),
-            ])
+            ]),
+
+            html.P(className='export_links', children=['Download: ',
+                html.A('SVG', id='image_svg', className='link_list'), ' ',
+                html.A('PNG', id='image_png', className='link_list'), ' ',
+                html.A('PDF', id='image_pdf', className='link_list')]),
 
         ]),    
 
@@ -189,81 +780,369 @@ layout_main = html.Div([
             children=[
                 dcc.Dropdown(
                     id='dropdown_cat',
-                    options=[
-                        {
-                        'label': re.sub('<br>', ' ', parentlist[i]) + ' | ' + re.sub('<br>', ' ', labellist[i]),
-                        'value': labellist[i]
-                        } for i in range(0, len(labellist))
-                        ],
+                    options=dropdown_options(),
                     multi=True, # Makes in sort that several categories can be selected
                     placeholder="Select one or more categories",
                     searchable=False
                 )
             ]),
 
+            html.Div(className='year_range',
+            children=[
+                dcc.RangeSlider(
+                    id='year_range',
+                    min=int(snapshot.cube.years[0]),
+                    max=int(snapshot.cube.years[-1]),
+                    step=1,
+                    value=[int(snapshot.cube.years[0]), int(snapshot.cube.years[-1])],
+                    marks={int(year): str(year) for year in snapshot.cube.years[::5]},
+                    tooltip={'placement': 'bottom'}
+                )
+            ]),
+
             # html.Div(className='choose_text', id='choose_text'),
         ]),  
     ]),
 
-    html.Div(id='list_inst', className='list_inst'),
+    # canonical key of the selection displayed in the list
+    dcc.Store(id='selection_key'),
+
+    # version of the dataset the page was rendered from
+    dcc.Store(id='data_version', data=snapshot.version),
+
+    html.Div(id='installation_detail', className='installation_detail'),
+
+    html.Div(id='list_inst', className='list_inst', style={'display': 'none'},
+    children=[
+        html.P(id='n_results', className='n_results'),
+
+        html.Div(id='facets', className='facets'),
+
+        html.Div(className='export_links', children=[
+            dcc.RadioItems(id='export_format', inline=True, value='csv',
+                options=[{'label': 'CSV', 'value': 'csv'}, {'label': 'JSON Lines', 'value': 'jsonl'},
+                    {'label': 'BibTeX', 'value': 'bibtex'}]),
+            html.Button('Download', id='export_button'),
+            html.Progress(id='export_progress', style={'display': 'none'}),
+            html.Button('Cancel', id='cancel_export', className='cancel_button', style={'display': 'none'}),
+            dcc.Download(id='export_download'),
+            dcc.Store(id='export_query')]),
+
+        dash_table.DataTable(
+            id='results_table',
+            columns=[
+                {'name': 'Name', 'id': 'Name', 'presentation': 'markdown'},
+                {'name': 'Creator(s)', 'id': 'Creator(s)'},
+                {'name': 'Year', 'id': 'Year'},
+                {'name': 'Source', 'id': 'Source'}
+                ],
+            data=[],
+            markdown_options={'link_target': '_blank'},
+            cell_selectable=True,
+            style_as_list_view=True,
+            style_header={'backgroundColor': '#F6F6F6', 'color': 'rgb(77, 77, 77)',
+                'fontWeight': '500', 'border': 'none'},
+            style_cell={'textAlign': 'left', 'fontFamily': 'Roboto', 'fontSize': '9pt',
+                'fontWeight': '500', 'textTransform': 'uppercase', 'height': '80px',
+                'paddingLeft': '40px', 'border': 'none', 'whiteSpace': 'normal'},
+            style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#F6F6F6'},
+                {'if': {'row_index': 'even'}, 'backgroundColor': '#EBEBEB'}]
+        ),
+    ]),
+
+    html.Div(className='list_inst', children=[
+
+        html.P(style={'paddingBottom': '2cm'}),
+
+        html.P(className='credits', children = 
+        ['✍ Created by ',
+                html.A(href='https://www.mcgill.ca/music/valerian-fraisse',
+                    children='Valérian Fraisse', target='_blank', className='link_credits'),
+                ' with the support of ',
+                html.A(href='https://www.mcgill.ca/sis/people/faculty/guastavino',
+                    children='Catherine Guastavino', target='_blank', className='link_credits'),
+                ' and ',
+                html.A(href='https://www.mcgill.ca/music/marcelo-m-wanderley',
+                    children='Marcelo Wanderley', target='_blank', className='link_credits'),
+                '. Designed by ',
+                html.A(href='http://camillemagnan.com/',
+                    children='Camille Magnan', target='_blank', className='link_credits'),
+                '.'
+        ]),
+
+            html.P(style={
+                'color': '#AEAEAE',
+                'paddingBottom': '1cm',
+                'paddingLeft': '1cm',
+                'fontWeight': '500',
+                'fontSize': '10pt'
+            }, 
+            children = [
+            'This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.'
+        ]),
+
+    ]),
 
 ])
 
+def main_layout(search):
+    """ Returns the main page layout with the selection encoded in the query string of the url.
+
+    Parameters
+    ----------
+    search : str
+        Query string of the url.
+    """
+    plotType, values, years = parse_selection(parse_qs((search or '').lstrip('?')))
+    layout = copy.deepcopy(layout_main)
+    layout['select_plot'].value = plotType
+    layout['dropdown_cat'].value = values
+    layout['data_version'].data = snapshot.version
+    if years is not None:
+        layout['year_range'].value = list(years)
+    return layout
+
+# Intersections page layout
+layout_intersections = html.Div([
+
+    html.Div(className="banner", 
+        children=[
+
+        html.H1(className='banner_header', children=["Interactive Sound Installations Database"]),
+
+        dcc.Link('HOME', href='/', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('GLOSSARY', href='/glossary', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('LIST OF INSTALLATIONS', href='/lists', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('INTERSECTIONS', href='/intersections', className='banner_link_fixed'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('MAP', href='/map', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('TRENDS', href='/trends', className='banner_link'),
+    ]), 
+
+    html.Div(className="page_lists",
+    children =[
+        html.P(style={'paddingBottom': '0.5cm'}),
+
+        html.H6(children=['Select a category to see how many installations share each combination of its sub-categories.'],
+            style={'fontSize' : '14pt', 'paddingLeft' : '40px'}),
+
+        html.Div(
+            dcc.Dropdown(
+                id='dropdown_group',
+                options=[
+                    {
+                    'label': re.sub('<br>', ' ', obj.name + ' | ' + label),
+                    'value': ID
+                    } for obj in (AI, IN, SD) for ID, label in zip(obj.IDs, obj.labels)
+                    ],
+                value='CO',
+                clearable=False
+            ), style={'paddingLeft': '40px', 'paddingRight': '80px'}),
+
+        html.Div(children=[
+            html.Progress(id='upset_progress', value='0', max='2', style={'display': 'none'}),
+            html.Span(id='upset_status', className='upset_status'),
+            html.Button('Cancel', id='cancel_upset', className='cancel_button', style={'display': 'none'}),
+        ], style={'paddingLeft': '40px', 'paddingTop': '20px'}),
+
+        dcc.Graph(id='upset'),
+
+        html.P(style={'paddingBottom': '2cm'}),
+    ]),
+])
+
+# Map page layout
+MAP_PAGE_SIZE = 20
+
+layout_map = html.Div([
+
+    html.Div(className="banner", 
+        children=[
+
+        html.H1(className='banner_header', children=["Interactive Sound Installations Database"]),
+
+        dcc.Link('HOME', href='/', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('GLOSSARY', href='/glossary', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('LIST OF INSTALLATIONS', href='/lists', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('INTERSECTIONS', href='/intersections', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('MAP', href='/map', className='banner_link_fixed'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('TRENDS', href='/trends', className='banner_link'),
+    ]), 
+
+    html.Div(className="page_lists",
+    children =[
+        html.P(style={'paddingBottom': '0.5cm'}),
+
+        html.H6(children=['Installations with similar tags are placed close together. Select categories to highlight their installations, click on a point to see its details.'],
+            style={'fontSize' : '14pt', 'paddingLeft' : '40px'}),
+
+        html.Div(
+            dcc.Dropdown(
+                id='map_cat',
+                options=[
+                    {
+                    'label': re.sub('<br>', ' ', parentlist[i]) + ' | ' + re.sub('<br>', ' ', labellist[i]),
+                    'value': labellist[i]
+                    } for i in range(0, len(labellist))
+                    ],
+                multi=True,
+                placeholder="Select one or more categories",
+                searchable=False
+            ), style={'paddingLeft': '40px', 'paddingRight': '80px'}),
+
+        dcc.Graph(id='map'),
+
+        html.Div(id='map_detail', className='installation_detail'),
+
+        dash_table.DataTable(
+            id='map_table',
+            columns=[
+                {'name': 'Name', 'id': 'Name', 'presentation': 'markdown'},
+                {'name': 'Creator(s)', 'id': 'Creator(s)'},
+                {'name': 'Year', 'id': 'Year'},
+                {'name': 'Source', 'id': 'Source'}
+                ],
+            data=[],
+            page_size=MAP_PAGE_SIZE,
+            markdown_options={'link_target': '_blank'},
+            style_as_list_view=True,
+            style_header={'backgroundColor': '#F6F6F6', 'color': 'rgb(77, 77, 77)',
+                'fontWeight': '500', 'border': 'none'},
+            style_cell={'textAlign': 'left', 'fontFamily': 'Roboto', 'fontSize': '9pt',
+                'fontWeight': '500', 'textTransform': 'uppercase', 'height': '80px',
+                'paddingLeft': '40px', 'border': 'none', 'whiteSpace': 'normal'},
+        ),
+
+        html.P(style={'paddingBottom': '2cm'}),
+    ]),
+])
+
+# Trends page layout
+layout_trends = html.Div([
+
+    html.Div(className="banner", 
+        children=[
+
+        html.H1(className='banner_header', children=["Interactive Sound Installations Database"]),
+
+        dcc.Link('HOME', href='/', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('GLOSSARY', href='/glossary', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('LIST OF INSTALLATIONS', href='/lists', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('INTERSECTIONS', href='/intersections', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('MAP', href='/map', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('TRENDS', href='/trends', className='banner_link_fixed'),
+    ]), 
+
+    html.Div(className="page_lists",
+    children =[
+        html.P(style={'paddingBottom': '0.5cm'}),
+
+        html.H6(children=['Select categories to see the share of the installations of each year belonging to them.'],
+            style={'fontSize' : '14pt', 'paddingLeft' : '40px'}),
+
+        html.Div(
+            dcc.Dropdown(
+                id='trends_cat',
+                options=[
+                    {
+                    'label': re.sub('<br>', ' ', parentlist[i]) + ' | ' + re.sub('<br>', ' ', labellist[i]),
+                    'value': labellist[i]
+                    } for i in range(0, len(labellist))
+                    ],
+                multi=True,
+                placeholder="Select one or more categories",
+                searchable=False
+            ), style={'paddingLeft': '40px', 'paddingRight': '80px'}),
+
+        dcc.Graph(id='trends'),
+
+        html.P(style={'paddingBottom': '2cm'}),
+    ]),
+])
+
 """ Callback functions."""  
 
 # Index callbacks
 @app.callback(Output('page_content', 'children'),
-                [Input('url', 'pathname')])
-def display_page(pathname):
+                [Input('url', 'pathname')],
+                State('url', 'search'))
+def display_page(pathname, search):
     """ Updates page content in function of chosen url.
+    The selection of the main page is restored from the query string.
 
     Parameters
     ----------
     pathname : str 
         Page to redirect to. 
+    search : str
+        Query string of the url.
     """
     if pathname == '/':
-        return layout_main
+        return main_layout(search)
     if pathname == '/glossary':
         return glossary.layout
     if pathname == '/lists':
         return lists.layout
+    if pathname == '/intersections':
+        return layout_intersections
+    if pathname == '/map':
+        return layout_map
+    if pathname == '/trends':
+        return layout_trends
     if pathname == '/submit':
         return submit.layout
     else:
-        return layout_main
+        return main_layout(search)
 
 
 # Main page callbacks
 @app.callback([Output("sunburst", "figure"),
     Output("page_content", 'style')], 
-    Input("select_plot", "value"))
-def update_figure(input_value):
+    [Input("select_plot", "value"),
+    Input("dropdown_cat", "value")])
+def update_figure(input_value, values):
     """ Updates the sunburst chart in function of the radio button selected.
-    If the snapshot html button is triggered (currently deactivated), saves a svg plot of the corresponding dimension.
+    The node values are recomputed for the installations belonging to
+    the categories selected in the dropdown menu.
+    Static images of the figure are served by /images (see image_links).
 
     Parameters
     ----------
     input_value : str
         Type of radio button selected.
-    n_clicks : int
-        Number of clicks for the snapshot html button.
+    values : list
+        Selected data from the dropdown list, used as filter.
     """
-    
+    key = tuple(sorted(values or []))
+
     if input_value == 'AI':
-        dframe = AI.df
+        dframe = filtered_frame('AI', key)
         colorscale = 'Burg'
         bg_color = 'linear-gradient(0deg, rgba(156,36,87,1) 0%, rgba(112,23,69,1) 100%)'
     elif input_value == 'SD':
-        dframe = SD.df
+        dframe = filtered_frame('SD', key)
         colorscale = 'Greens'
         bg_color = 'linear-gradient(0deg, rgba(0,96,39,1) 0%, rgba(0,66,26,1) 100%)'
     elif input_value == 'IN':
-        dframe = IN.df
+        dframe = filtered_frame('IN', key)
         colorscale = 'Blues'
         bg_color = 'linear-gradient(0deg, rgba(24,82,164,1) 0%, rgba(6,48,107,1) 100%)'
     # elif input_value == 'FI':
-    #     dframe = FI.df
+    #     dframe = field_sunburst(snapshot.version).df
     #     colorscale = 'GnBu_r'
     #     marker = None
     if input_value != 'FI':
@@ -280,6 +1159,7 @@ def update_figure(input_value):
             branchvalues='total',
             values=dframe['values'],
             # hovertemplate='<b>%{label} </b> <br>Elements concerned: %{value}<br>',
+            texttemplate='%{label}<br>(%{value})',
             hoverinfo = 'skip',
             maxdepth=3,
             name = '',
@@ -305,13 +1185,254 @@ def update_figure(input_value):
 
     return fig, style
 
+@app.callback([Output('image_' + fmt, 'href') for fmt in IMAGE_FORMATS],
+    [Input("select_plot", "value"),
+    Input("dropdown_cat", "value")])
+def image_links(plotType, values):
+    """ Updates the urls downloading the static images of the sunburst displayed.
+
+    Parameters
+    ----------
+    plotType : str
+        Type of sunburst selected.
+    values : list
+        Selected data from the dropdown list, used as filter.
+    """
+    query = urlencode([('category', value) for value in sorted(set(values or []))])
+    return ['/images/' + plotType + '.' + fmt + ('?' + query if query else '') for fmt in IMAGE_FORMATS]
+
+# Intersections page callbacks
+@app.callback(Output('upset', 'figure'),
+    Input('dropdown_group', 'value'),
+    background=True,
+    running=[
+        (Output('dropdown_group', 'disabled'), True, False),
+        (Output('cancel_upset', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+        (Output('upset_progress', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+        (Output('upset_status', 'style'), {'display': 'inline'}, {'display': 'none'}),
+    ],
+    progress=[Output('upset_progress', 'value'), Output('upset_progress', 'max'), Output('upset_status', 'children')],
+    cancel=[Input('cancel_upset', 'n_clicks')])
+def update_upset(set_progress, group):
+    """ Updates the UpSet plot in function of the selected category.
+    Runs as a background job, reporting its current step: counting the intersections,
+    then drawing them. The cancel button is shown while it runs.
+
+    Parameters
+    ----------
+    set_progress : function
+        Reports the progress of the job.
+    group : str
+        ID of the category selected in the dropdown menu.
+    """
+    set_progress(('0', '2', 'Counting the intersections...'))
+    group_intersections(group)
+    set_progress(('1', '2', 'Drawing the plot...'))
+    return upset_figure(group)
+
+# Glossary page callbacks
+@app.callback(Output({'type': 'glossary_terms', 'index': MATCH}, 'children'),
+    Input({'type': 'glossary_summary', 'index': MATCH}, 'n_clicks'),
+    State({'type': 'glossary_terms', 'index': MATCH}, 'children'),
+    State({'type': 'glossary_summary', 'index': MATCH}, 'id'),
+    prevent_initial_call=True)
+def expand_glossary(n_clicks, loaded, summary):
+    """ Fetches the sub-terms of a glossary node the first time it is expanded.
+
+    Parameters
+    ----------
+    n_clicks : int
+        Number of clicks on the summary of the node.
+    loaded : list
+        Sub-terms already fetched.
+    summary : dict
+        ID of the summary, holding the path of the node.
+    """
+    if loaded:
+        return dash.no_update
+    return glossary.render_children(summary['index'])
+
+@app.callback(Output('glossary_search', 'options'),
+    Input('glossary_search', 'search_value'),
+    State('glossary_search', 'value'))
+def search_glossary(search_value, value):
+    """ Returns the glossary terms matching the searched text, from the term index.
+
+    Parameters
+    ----------
+    search_value : str
+        Text typed in the search box.
+    value : str
+        Path of the term selected.
+    """
+    keys = glossary.search(search_value) if search_value else []
+    if value and value not in keys:
+        keys = [value] + keys
+    return [{'label': glossary.nodes[key]['term'] + ' (' + ' > '.join(glossary.lineage(key)[:-1]) + ')'
+        if '.' in key else glossary.nodes[key]['term'], 'value': key} for key in keys]
+
+@app.callback(Output('glossary_definition', 'children'),
+    Input('glossary_search', 'value'),
+    prevent_initial_call=True)
+def show_definition(key):
+    """ Displays the definition of the term selected in the search box, with the number
+    of installations of the corresponding category and a link listing them.
+
+    Parameters
+    ----------
+    key : str
+        Path of the term.
+    """
+    if not key:
+        return None
+    node = glossary.nodes[key]
+    children = [html.H6(' > '.join(glossary.lineage(key))), glossary.definition(node)]
+    if node.get('id') in snapshot.tagindex and node['id'] in IDlist:
+        plotType = {'AI': 'AI', 'IN': 'IN', 'SyD': 'SD'}[glossary.nodes[key.split('.')[0]]['id']]
+        label = labellist[IDlist.index(node['id'])]
+        children.append(dcc.Link(str(snapshot.counts[snapshot.tagindex[node['id']]]) + ' installations',
+            href='/' + selection_query(plotType, [label], None), className='link_list'))
+    return children
+
+# Trends page callbacks
+@app.callback(Output('trends', 'figure'),
+    Input('trends_cat', 'value'))
+def update_trends(values):
+    """ Updates the trends chart in function of the selected categories.
+
+    Parameters
+    ----------
+    values : list
+        Selected data from the dropdown list.
+    """
+    return trends_figure(list(values or []))
+
+# Map page callbacks
+@app.callback(
+    [Output('map', 'figure'),
+    Output('map_table', 'data'),
+    Output('map_table', 'page_current'),
+    Output('map_table', 'style_data_conditional'),
+    Output('map_detail', 'children')],
+    [Input('map_cat', 'value'),
+    Input('map', 'clickData')])
+def update_map(values, clickData):
+    """ Updates the map in function of the selected categories. The projection is
+    computed once with the snapshot, only the selection is applied here.
+    A clicked point is emphasized, its details are displayed and its row
+    is highlighted in the table of the selected installations. Clicks on
+    installations removed from the dataset since the map was drawn are ignored.
+
+    Parameters
+    ----------
+    values : list
+        Selected data from the dropdown list.
+    clickData : dict
+        Data about the clicked point.
+    """
+    values = list(values or [])
+    mask = select_rows(values)
+    ID = None
+    if clickData is not None and dash.callback_context.triggered_id == 'map':
+        ID = int(clickData['points'][0]['customdata'])
+        if ID not in snapshot.rowof:
+            ID = None
+
+    records = make_list(values, 'AI')
+    styles = [{'if': {'row_index': 'odd'}, 'backgroundColor': '#F6F6F6'},
+        {'if': {'row_index': 'even'}, 'backgroundColor': '#EBEBEB'}]
+    if ID is None:
+        return map_figure(mask), records, 0, styles, None
+
+    # Position of the clicked installation in the table, added on top when outside the selection
+    position = snapshot.rowof[ID]
+    if mask[position]:
+        row = int(mask[:position].sum())
+    else:
+        records = to_records(snapshot.take([position])) + records
+        row = 0
+    styles.append({'if': {'row_index': row % MAP_PAGE_SIZE}, 'backgroundColor': '#D9B8C6'})
+    return map_figure(mask, ID), records, row // MAP_PAGE_SIZE, styles, installation_detail(ID)
+
+@app.callback(
+    [Output('year_range', 'min'),
+    Output('year_range', 'max'),
+    Output('year_range', 'marks'),
+    Output('year_range', 'value')],
+    Input('data_version', 'data'),
+    [State('year_range', 'min'),
+    State('year_range', 'max'),
+    State('year_range', 'value')])
+def update_year_range(version, low, high, year_range):
+    """ Sets the bounds of the year slider to the years of the version of the dataset
+    the page was rendered from, rather than the ones of the layout. A range spanning
+    all the years keeps doing so; other ranges are clamped to the new bounds.
+
+    Parameters
+    ----------
+    version : str
+        Version of the dataset.
+    low : int
+        First year of the slider.
+    high : int
+        Last year of the slider.
+    year_range : list
+        First and last year selected on the slider.
+    """
+    start, stop = int(snapshot.cube.years[0]), int(snapshot.cube.years[-1])
+    if [start, stop] == [low, high]:
+        raise PreventUpdate
+    if not year_range or list(year_range) == [low, high]:
+        year_range = [start, stop]
+    else:
+        year_range = [min(max(int(year), start), stop) for year in year_range]
+    return start, stop, {int(year): str(year) for year in snapshot.cube.years[::5]}, year_range
+
+@app.callback(
+    Output('url', 'search'),
+    [Input('sunburst', 'clickData'),
+    Input('dropdown_cat', 'value'),
+    Input('select_plot', 'value'),
+    Input('year_range', 'value')],
+    prevent_initial_call=True)
+def update_url(clickData, values, plotType, year_range):
+    """ Encodes the selection of the main page in the query string of the url,
+    so that the view can be shared, restored and cached.
+
+    Parameters
+    ----------
+    clickData : dict
+        Data about the sunburt's clicked section.
+    values : list
+        Selected data from the dropdown list.
+    plotType : str
+        Type of sunburst selected on the radio buttons.
+    year_range : list
+        First and last year selected on the slider.
+    """
+    return selection_query(plotType, selection_values(clickData, values, plotType), year_filter(year_range))
+
 @app.callback(
-    Output('list_inst', 'children'),
+    [Output('n_results', 'children'),
+    Output('facets', 'children'),
+    Output('dropdown_cat', 'options'),
+    Output('results_table', 'data'),
+    Output('export_query', 'data'),
+    Output('list_inst', 'style'),
+    Output('selection_key', 'data')],
     [Input('sunburst', 'clickData'),
     Input('dropdown_cat', 'value'),
-    Input('select_plot', 'value')])
-def display_list(clickData, values, plotType):
-    """ Displays the html list in fuction of the callback inputs.
+    Input('select_plot', 'value'),
+    Input('year_range', 'value')],
+    State('selection_key', 'data'))
+def display_list(clickData, values, plotType, year_range, previous_key):
+    """ Displays the list in fuction of the callback inputs.
+    Only the records of the installations are sent to the results table,
+    the rest of the list being part of the layout.
+    The facet counts of the listed installations (categories of the dropdown menu,
+    publications, types, sources and decades) are computed at once from the same mask.
+    Nothing is recomputed nor sent when the selection is the same as the one displayed,
+    e.g. when switching dimensions or clicking on a top-level segment.
 
     Parameters
     ----------
@@ -322,85 +1443,560 @@ def display_list(clickData, values, plotType):
         Selected data from the dropdown list.
     plotType : str
         Type of sunburst selected on the radio buttons.
+    year_range : list
+        First and last year selected on the slider.
+    previous_key : list
+        Canonical key of the selection currently displayed.
+    """
+    unchanged = [dash.no_update] * 7
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    if triggered == ['select_plot.value'] and clickData is None and previous_key is not None:
+        side_effect('metric', 'display_list', 'unchanged')
+        return unchanged
+
+    values = selection_values(clickData, values, plotType)
+    years = year_filter(year_range)
+    sections = sorted(set(to_sections(values)))
+
+    key = sections + (['{}-{}'.format(*years)] if years else [])
+    if key == previous_key:
+        side_effect('metric', 'display_list', 'unchanged')
+        return unchanged
+    side_effect('metric', 'display_list', 'computed')
+
+    positions = selected_rows(tuple(sections), years)
+    mask = np.zeros(len(snapshot), dtype=bool)
+    mask[positions] = True
+    counts = snapshot.facets.counts(mask, snapshot.tags)
+    if key == []:
+        return '', [], dropdown_options(counts), [], None, {'display': 'none'}, key
+
+    records = to_records(snapshot.take(positions))
+    side_effect('selection', selection_query(plotType, values, years))
+    return (str(len(records)) + ' results', facet_panel(counts), dropdown_options(counts), records,
+        export_query(values, years), {'display': 'block'}, key)
+
+@app.callback(
+    Output('installation_detail', 'children'),
+    Input('results_table', 'active_cell'),
+    prevent_initial_call=True)
+def display_detail(active_cell):
+    """ Displays the tags of the installation whose row was clicked in the list.
+
+    The panel is emptied when the installation was removed from the dataset
+    since the list was displayed.
+
+    Parameters
+    ----------
+    active_cell : dict
+        Row, column and row id of the cell clicked in the results table.
+    """
+    if active_cell is None:
+        return dash.no_update
+    if active_cell.get('row_id') not in snapshot.rowof:
+        return []
+    return installation_detail(active_cell['row_id'])
+
+
+@server.after_request
+def record_payload(response):
+    """ Records the size of each callback response, by callback output,
+    so that the growth of payloads is visible in /metrics.
+
+    Parameters
+    ----------
+    response : flask response
+    """
+    if request.path.endswith('/_dash-update-component') and not response.direct_passthrough:
+        output = (request.get_json(silent=True) or {}).get('output', '')
+        metrics.observe('callback_payload_bytes', output, response.calculate_content_length() or 0)
+    return response
+
+
+""" Admission control: requests over the concurrency limit of their route wait in a bounded
+queue, and are rejected with a 503 when it is full; clients over their rate get a 429.
+Checked before any other work on the request, including the response cache."""
+admission = None
+if settings.ADMISSION:
+    admission = AdmissionControl(settings.ADMISSION_LIMITS, settings.RATE_LIMITS,
+        settings.ADMISSION_QUEUE, settings.ADMISSION_TIMEOUT)
+
+    @server.before_request
+    def admit_request():
+        """ Admits the request or answers it with the rejection."""
+        output = ''
+        if request.path.endswith('/_dash-update-component'):
+            output = (request.get_json(silent=True) or {}).get('output', '')
+        client = request.remote_addr or ''
+        if settings.CLIENT_HEADER and request.headers.get(settings.CLIENT_HEADER):
+            client = request.headers[settings.CLIENT_HEADER].split(',')[-1].strip()
+        g.gate, status, retry = admission.admit(request.path, output, client)
+        if status is not None:
+            return Response('Too many requests, retry later.' if status == 429 else 'Server busy, retry later.',
+                status=status, mimetype='text/plain', headers={'Retry-After': str(retry)})
+        return None
+
+    @server.teardown_request
+    def release_request(exception):
+        """ Frees the slot of the request once it is handled, streamed responses included.
+
+        Parameters
+        ----------
+        exception : Exception
+            Error raised while handling the request, if any.
+        """
+        gate = g.pop('gate', None)
+        if gate is not None:
+            gate.release()
+
+""" Reload of the csv when it is edited: the snapshot is updated incrementally from the
+row hashes. The modification time of the csv is checked before requests, at most every
+DATA_RELOAD_INTERVAL seconds, by one request at a time, which parses the csv then
+updates the snapshot holding the data lock exclusively."""
+reloading = {'mtime': os.path.getmtime(DATA_PATH), 'checked': time.monotonic(), 'lock': threading.Lock()}
+
+@server.before_request
+def reload_data():
+    """ Updates the snapshot if the csv changed since the last check. An invalid
+    csv is logged and the previous version kept."""
+    if settings.DATA_RELOAD_INTERVAL <= 0 or time.monotonic() - reloading['checked'] < settings.DATA_RELOAD_INTERVAL:
+        return None
+    if not reloading['lock'].acquire(blocking=False):
+        return None
+    try:
+        reloading['checked'] = time.monotonic()
+        mtime = os.path.getmtime(DATA_PATH)
+        if mtime != reloading['mtime']:
+            reloading['mtime'] = mtime
+            start = time.perf_counter()
+            new = load_data.__wrapped__(DATA_PATH)
+            with data_lock.writing():
+                changes = update_installations(new)
+            images.prune(snapshot.version)
+            metrics.observe('data_reload_seconds', '', time.perf_counter() - start)
+            logging.getLogger(__name__).info('Reloaded %s: %d added, %d changed, %d removed', DATA_PATH,
+                len(changes['added']), len(changes['changed']), len(changes['removed']))
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning('Could not reload %s: %s', DATA_PATH, e)
+    finally:
+        reloading['lock'].release()
+    return None
+
+@server.before_request
+def hold_data():
+    """ Holds the data lock in shared mode while the view of the request runs, once
+    it is admitted and the csv checked. Requests answered by an earlier hook don't take it."""
+    data_lock.acquire_read()
+    g.data_lock = True
+    return None
+
+def release_data():
+    """ Releases the data lock held by the request, if any. Called once the view returns,
+    before the response is streamed, or earlier by views done with the data."""
+    if g.pop('data_lock', False):
+        data_lock.release_read()
+
+@server.after_request
+def unlock_data(response):
+    """ Releases the data lock before the response is sent.
+
+    Parameters
+    ----------
+    response : flask response
+    """
+    release_data()
+    return response
+
+@server.teardown_request
+def unlock_data_on_error(exception):
+    """ Releases the data lock of a request whose view failed.
+
+    Parameters
+    ----------
+    exception : Exception
+        Error raised while handling the request, if any.
+    """
+    release_data()
+
+""" Memoization of the callback responses: identical update requests on the same
+dataset version are answered with the stored response body, before Dash parses
+and dispatches them, once the csv is checked and the data lock held, so that the
+version is the current one. The side effects of the callback (selection log, metrics)
+are stored with the body and replayed. The key ignores the endId the renderer adds
+to every request (a token of the page load). Background callbacks, whose responses are job handles,
+and the submission form, which has side effects, are left out by output, and so are
+requests carrying other arguments (background job polling and cancellation)."""
+UNCACHED_OUTPUTS = {'output.children'}
+response_cache = None
+if settings.RESPONSE_CACHE:
+    response_cache = ResponseCache(settings.RESPONSE_CACHE_BYTES,
+        diskcache.Cache(os.path.join(settings.CACHE_DIR, 'responses')) if settings.RESPONSE_CACHE_DISK else None)
+
+    @server.before_request
+    def cached_response():
+        """ Answers a callback request from the response cache when possible."""
+        if not request.path.endswith('/_dash-update-component') or set(request.args) - {'endId'}:
+            return None
+        body = request.get_json(silent=True) or {}
+        output = body.get('output')
+        if not isinstance(output, str) or output in UNCACHED_OUTPUTS or app.callback_map.get(output, {}).get('background'):
+            return None
+        g.response_key = request_key(body, snapshot.version)
+        entry = response_cache.get(g.response_key)
+        if entry is not None:
+            g.response_key = None
+            body, mimetype, effects = entry
+            for name, args in effects:
+                EFFECTS[name](*args)
+            return Response(body, mimetype=mimetype)
+        g.effects = []
+        return None
+
+    @server.after_request
+    def store_response(response):
+        """ Stores the body of a computed callback response.
+
+        Parameters
+        ----------
+        response : flask response
+        """
+        key = g.pop('response_key', None)
+        if key is not None and response.status_code == 200 and not response.direct_passthrough:
+            response_cache.put(key, response.get_data(), response.mimetype, tuple(g.pop('effects', ())))
+        return response
+
+""" API endpoints."""
+@server.route('/api/installations/<int:ID>/tags')
+def api_tags(ID):
+    """ Returns the tags associated with an installation as json.
+
+    Parameters
+    ----------
+    ID : int
+        ID of the installation.
+    """
+    if ID not in snapshot.rowof:
+        abort(404)
+    return jsonify(
+        id=ID,
+        name=installation_name(ID),
+        tags=[dict(dimension=dimension, category=category, label=label, column=col)
+            for dimension, category, label, col in snapshot.tagsof[ID]])
+
+@server.route('/api/installations/<int:ID>/similar')
+def api_similar(ID):
+    """ Returns the installations most similar to an installation as json.
+    The query string may set the number of installations (k) and the metric
+    (jaccard or cosine).
+
+    Parameters
+    ----------
+    ID : int
+        ID of the installation.
     """
-    rows = []
-    parents = []
-    str_values = []
+    if ID not in snapshot.rowof:
+        abort(404)
+    k = request.args.get('k', 10, type=int)
+    metric = request.args.get('metric', 'jaccard')
+    if metric not in ('jaccard', 'cosine') or k < 1:
+        abort(400)
+    return jsonify(
+        id=ID,
+        metric=metric,
+        similar=[dict(id=similar, name=installation_name(similar), score=score)
+            for similar, score in similar_installations(ID, k, metric, snapshot.version)])
 
-    if values is None or values == []:
-        if clickData is None or (len(clickData['points'][0]['id']) <= 6 and plotType != 'FI') or clickData['points'][0]['id'] in parentlist:    
-            return
-        else:
-            values = [clickData['points'][0]['label']]
-            parent = clickData['points'][0]['parent']
-            parents.append(parent)
-            rows = make_list(values, plotType)
+@server.route('/api/installations/duplicates', methods=['POST'])
+def api_duplicates():
+    """ Returns the likely duplicates of installations about to be submitted, as json.
+    The body is an installation or a list of installations, with their Name,
+    Creator(s), Hyperlink and tag columns (missing tags standing for 0). Installations
+    without ID are numbered -1, -2, etc. so that duplicates within the body are reported."""
+    records = request.get_json(silent=True)
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, list) or not records or not all(isinstance(record, dict) for record in records):
+        abort(400)
+    new = pd.DataFrame(records)
+    for col in ['Name', 'Creator(s)', 'Hyperlink']:
+        new[col] = new[col].fillna('') if col in new.columns else ''
+    for col in snapshot.tagcols:
+        new[col] = pd.to_numeric(new[col], errors='coerce').fillna(0) if col in new.columns else 0
+    numbers = pd.Series(-1 - new.index, index=new.index)
+    new['ID'] = new['ID'].fillna(numbers) if 'ID' in new.columns else numbers
+    return jsonify(duplicates=[dict(ID=int(new['ID'].iloc[i]), matches=[dict(match, name=installation_name(match['ID'])
+        if match['ID'] in snapshot.rowof else None) for match in matches])
+        for i, matches in snapshot.find_duplicates(new).items()])
 
+@server.route('/api/installations', methods=['POST'])
+def api_add_installations():
+    """ Adds installations to the csv and the live snapshot, and returns their IDs as json.
+    The body is an installation or a list of installations, with the columns of the csv
+    (missing tags standing for 0, installations without ID being given the next free ones).
+    Either every installation is added or none: invalid ones are answered with a 400 and
+    likely duplicates of existing installations or of each other with a 409, unless
+    the query string sets force=1.
+    Requires the API token as a bearer token, the endpoint being disabled without one."""
+    if not settings.API_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + settings.API_TOKEN):
+        abort(401)
+    records = request.get_json(silent=True)
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, list) or not records or not all(isinstance(record, dict) for record in records):
+        abort(400)
+
+    importer = Importer(snapshot, columns=csv_columns(DATA_PATH), duplicates=True)
+    valid = importer.check(importer.prepare(pd.DataFrame(records, dtype=object)))
+    if importer.errors:
+        return jsonify(errors=[dict(index=line, ID=ID, error=message) for line, ID, message in importer.errors]), 400
+    new = compact(valid)[importer.columns]
+    release_data()
+    try:
+        append_installations(new, request.args.get('force') == '1', DATA_PATH)
+    except ValueError as e:
+        return jsonify(errors=[dict(error=str(e))]), 409
+    return jsonify(added=new['ID'].tolist()), 201
+
+@server.route('/api/changelog')
+def api_changelog():
+    """ Returns the IDs of the installations added, changed and removed by each version
+    of the dataset since startup, oldest first, as json. The query string may set the
+    version (since) after which the changes are returned."""
+    entries = list(snapshot.changelog)
+    since = request.args.get('since')
+    if since is not None:
+        versions = [entries[0]['previous']] + [entry['version'] for entry in entries] if entries else [snapshot.version]
+        if since not in versions:
+            abort(404)
+        entries = entries[len(versions) - 1 - versions[::-1].index(since):]  # content may come back to a version
+    return jsonify(version=snapshot.version, changes=entries)
+
+@server.route('/metrics')
+def api_metrics():
+    """ Returns the metrics of the application as json."""
+    report = metrics.report()
+    if response_cache is not None:
+        report['response_cache'] = response_cache.stats()
+    if admission is not None:
+        report['admission'] = admission.stats()
+    return jsonify(report)
+
+@server.route('/export/<fmt>')
+def export_list(fmt):
+    """ Streams the installations belonging to the categories given in the
+    query string (all of them if none), optionally from year_from to year_to,
+    in the requested format.
+    Rows are serialized by chunks, so that the response starts immediately
+    and the memory used doesn't depend on the size of the export. They are read
+    from a view of the snapshot, so the data lock isn't held while streaming.
+
+    Parameters
+    ----------
+    fmt : str
+        Export format: csv, jsonl or bibtex.
+    """
+    if fmt not in export.FORMATS:
+        abort(404)
+    writer, mimetype, extension = export.FORMATS[fmt]
+    plotType, values, years = parse_selection(request.args.to_dict(flat=False))
+    rows = selected_rows(tuple(sorted(set(to_sections(values)))), years)
+    return Response(stream_with_context(writer(snapshot.view(), rows)), mimetype=mimetype,
+        headers={'Content-Disposition': 'attachment; filename=installations.' + extension})
+
+@app.callback(Output('export_download', 'data'),
+    Input('export_button', 'n_clicks'),
+    State('export_format', 'value'),
+    State('export_query', 'data'),
+    background=True,
+    running=[
+        (Output('export_button', 'disabled'), True, False),
+        (Output('cancel_export', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+        (Output('export_progress', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+    ],
+    progress=[Output('export_progress', 'value'), Output('export_progress', 'max')],
+    cancel=[Input('cancel_export', 'n_clicks')],
+    cache_args_to_ignore=[0],
+    prevent_initial_call=True)
+def download_export(set_progress, n_clicks, fmt, query):
+    """ Downloads the installations of the selection displayed in the requested format.
+    Runs as a background job reporting the number of installations serialized, so that
+    large exports don't hold a server thread; the result is reused for the same
+    selection and version of the dataset whatever the number of clicks.
+
+    Parameters
+    ----------
+    set_progress : function
+        Reports the progress of the job.
+    n_clicks : int
+        Number of clicks on the download button.
+    fmt : str
+        Export format: csv, jsonl or bibtex.
+    query : str
+        Query string of the export, as returned by export_query.
+    """
+    if fmt not in export.FORMATS or query is None:
+        raise PreventUpdate
+    writer, mimetype, extension = export.FORMATS[fmt]
+    plotType, values, years = parse_selection(parse_qs(query.lstrip('?')))
+    rows = selected_rows(tuple(sorted(set(to_sections(values)))), years)
+    total = str(len(rows))
+    content = ''.join(writer(snapshot, rows, lambda done: set_progress((str(done), total))))
+    return dict(content=content, filename='installations.' + extension, type=mimetype)
+
+@server.route('/images/<plotType>.<fmt>')
+def sunburst_image(plotType, fmt):
+    """ Downloads the static image of a sunburst, filtered by the categories given
+    in the query string. The image is rendered on the first request for the current
+    version of the dataset, then served from the disk cache. The figure is built
+    holding the data lock, which is released before rendering.
+
+    Parameters
+    ----------
+    plotType : str
+        Type of sunburst: AI, IN or SD.
+    fmt : str
+        Image format: svg, png or pdf.
+    """
+    if plotType not in ('AI', 'IN', 'SD') or fmt not in IMAGE_FORMATS:
+        abort(404)
+    values = sorted(set(request.args.getlist('category')))
+    figure, version = update_figure(plotType, values)[0], snapshot.version
+    release_data()
+    path = images.get(plotType, figure, fmt, version)
+    response = send_file(path, mimetype=IMAGE_FORMATS[fmt], as_attachment=True,
+        download_name='sunburst-' + plotType + '.' + fmt)
+    response.cache_control.max_age = 60
+    return response
+
+@server.cli.command('export-images')
+@click.option('--format', 'formats', multiple=True, type=click.Choice(list(IMAGE_FORMATS)),
+    help='Image format, repeatable (all of them by default).')
+@click.option('--filter', 'filters', multiple=True,
+    help='Comma-separated categories of a filtered variant, repeatable.')
+@click.option('--keep-outdated', is_flag=True, help='Keep the images of the previous versions of the dataset.')
+def export_images(formats, filters, keep_outdated):
+    """ Renders the static images of every sunburst, unfiltered and for each filter,
+    in parallel, into the image cache served by /images.
+    Example: flask --app app export-images --format svg --filter "Outdoor,Museum"
+    """
+    selections = [[]] + [sorted({value.strip() for value in f.split(',') if value.strip()}) for f in filters]
+    figures = [(plotType, update_figure(plotType, values)[0]) for values in selections for plotType in ('AI', 'IN', 'SD')]
+    start = time.perf_counter()
+    paths = images.export(figures, list(formats) or list(IMAGE_FORMATS), snapshot.version)
+    if not keep_outdated:
+        images.prune(snapshot.version)
+    for path in paths:
+        click.echo(path)
+    click.echo('{} images in {:.1f} s'.format(len(paths), time.perf_counter() - start), err=True)
+
+@server.route('/results')
+def results_page():
+    """ Server-rendered variant of the results list, for the selection given in the
+    query string. Urls are scoped by the version of the dataset (v parameter), so that
+    a reverse proxy can cache each of them for good: a url without version or with an
+    outdated one redirects to the canonical url of the current version.
+    """
+    plotType, values, years = parse_selection(request.args.to_dict(flat=False))
+    canonical = selection_query(plotType, values, years) + '&v=' + snapshot.version
+    if request.full_path.rstrip('?') != '/results' + canonical:
+        response = redirect('/results' + canonical)
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        return response
+
+    etag = hashlib.sha1(canonical.encode()).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
     else:
-        if clickData is None or (len(clickData['points'][0]['id']) <= 6 and plotType != 'FI') or clickData['points'][0]['id'] in parentlist:
-            for value in values:
-                parents.append(parentlist[labellist.index(value)])     
-            rows = make_list(values, plotType)
-
-        else:
-            for value in values:
-                parents.append(parentlist[labellist.index(value)])
-            parent = clickData['points'][0]['parent']
-            parents.append(parent)
-            values.append(clickData['points'][0]['label'])
-            rows = make_list(values, plotType)
-
-    if rows == []:
-        output_list = html.Div([html.P(className='n_results', children=[str(len(rows)) + ' results'])])
-    
-
-    for i in range(0, len(parents)):
-        str_values.append([re.sub('<br>', ' ', parents[i]) + ' | ' 
-            + re.sub('<br>', ' ', values[i])])
-    
-    if len(values) > 1:
-        output_list = html.Div([html.P(className='n_results', children=[str(len(rows)) + ' results']), html.Table(
-                    [html.Th(col) for col in ['Name', 'Creator(s)', 'Year', 'Source']]
-                    + rows
-                )])
-    elif len(values) == 1:
-        output_list = html.Div([html.P(className='n_results', children=[str(len(rows)) + ' results']), html.Table(
-                    [html.Th(col) for col in ['Name', 'Creator(s)', 'Year', 'Source']]
-                    + rows
-                )])
-    
-    return output_list, html.Div([
+        rows = selected_rows(tuple(sorted(set(to_sections(values)))), years)
+        title = ', '.join(values) or 'All installations'
+        if years is not None:
+            title += ' ({}-{})'.format(*years)
+        selections.record(selection_query(plotType, values, years))
+        response = Response(stream_with_context(export.html_page(snapshot.view(), rows, title)), mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = settings.RESULTS_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
-        html.P(style={'paddingBottom': '2cm'}),
+""" Warm-up: builds the derived data, layouts and figures, and replays the most frequent
+selections of the access log, so that the first users don't pay for cold caches.
+The server answers meanwhile, /readyz reporting ready once the warm-up is done.
+The warm-up thread then writes the selection log periodically, and it is written at exit."""
+@data_lock.reader
+def replay_selection(query):
+    """ Fills the caches of a selection of the access log.
 
-        html.P(className='credits', children = 
-        ['✍ Created by ',
-                html.A(href='https://www.mcgill.ca/music/valerian-fraisse',
-                    children='Valérian Fraisse', target='_blank', className='link_credits'),
-                ' with the support of ',
-                html.A(href='https://www.mcgill.ca/sis/people/faculty/guastavino',
-                    children='Catherine Guastavino', target='_blank', className='link_credits'),
-                ' and ',
-                html.A(href='https://www.mcgill.ca/music/marcelo-m-wanderley',
-                    children='Marcelo Wanderley', target='_blank', className='link_credits'),
-                '. Designed by ',
-                html.A(href='http://camillemagnan.com/',
-                    children='Camille Magnan', target='_blank', className='link_credits'),
-                '.'
-        ]),
+    Parameters
+    ----------
+    query : str
+        Canonical query string of the selection.
+    """
+    plotType, values, years = parse_selection(parse_qs(query.lstrip('?')))
+    pio.json.to_json_plotly(update_figure(plotType, values)[0])
+    to_records(snapshot.take(selected_rows(tuple(sorted(set(to_sections(values)))), years)))
 
-            html.P(style={
-                'color': '#AEAEAE',
-                'paddingBottom': '1cm',
-                'paddingLeft': '1cm',
-                'fontWeight': '500',
-                'fontSize': '10pt'
-            }, 
-            children = [
-            'This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.'
-        ]),
+def replay_selections():
+    """ Fills the caches of the most frequent selections of the access log,
+    holding the data lock for one selection at a time."""
+    for query in selections.top(settings.WARMUP_SELECTIONS):
+        replay_selection(query)
 
-    ])
+warm_up = warmup.WarmUp()
+warm_up.start([
+    ('snapshot', data_lock.reader(lambda: (snapshot.data, snapshot.coords))),
+    ('layouts', data_lock.reader(lambda: [pio.json.to_json_plotly(layout) for layout in
+        (layout_main, layout_intersections, layout_map, layout_trends, glossary.layout, lists.layout)])),
+    ('sunbursts', data_lock.reader(lambda: [pio.json.to_json_plotly(update_figure(plotType, [])[0]) for plotType in ('AI', 'IN', 'SD')])),
+    ('intersections', data_lock.reader(lambda: pio.json.to_json_plotly(upset_figure('CO')))),
+    ('selections', replay_selections),
+    ('images', lambda: images.prune(snapshot.version)),
+], selections.write, settings.ACCESS_LOG_INTERVAL)
+atexit.register(selections.write)
+
+""" Structures reported by the memory diagnostics, in order of attribution."""
+memory.register('data', lambda: data)
+memory.register('snapshot.segments', lambda: snapshot.segments)
+memory.register('snapshot.tags', lambda: snapshot._tags)
+memory.register('snapshot.words', lambda: (snapshot._words, snapshot._norms, snapshot._ids))
+memory.register('snapshot.embedding', lambda: (snapshot.embedding, snapshot._coords))
+memory.register('snapshot.facets', lambda: snapshot.facets)
+memory.register('snapshot.duplicates', lambda: snapshot.duplicates)
+memory.register('snapshot.trends', lambda: (snapshot.cube, snapshot.years))
+memory.register('snapshot.fieldrows', lambda: snapshot.fieldrows)
+memory.register('snapshot.tagsof', lambda: (snapshot.tagsof, snapshot.nodes))
+memory.register('snapshot.rowof', lambda: snapshot.rowof)
+memory.register('sunburst', lambda: [AI, IN, SD])
+memory.register('lists.table', lambda: lists.table)
+memory.register('glossary', lambda: (glossary.nodes, glossary.index, glossary.layout))
+memory.register('layouts', lambda: [layout_main, layout_intersections, layout_map, layout_trends])
+for cache in (tag_counts, filtered_frame, field_sunburst, group_intersections, selected_rows, similar_installations):
+    memory.register('cache.' + cache.__name__, lambda cache=cache: cache.items(), lambda cache=cache: len(cache))
+if response_cache is not None:
+    memory.register('cache.responses', lambda: response_cache.entries, lambda: len(response_cache.entries))
+
+@server.route('/debug/memory')
+def debug_memory():
+    """ Returns the memory used by the registered structures and caches, and the top
+    allocators since startup, as json. Only served when memory diagnostics are enabled."""
+    if not settings.MEMORY_DIAGNOSTICS:
+        abort(404)
+    return jsonify(memory.report(request.args.get('top', 20, type=int)))
+
+@server.route('/healthz')
+def healthz():
+    """ Liveness: the server answers."""
+    return jsonify(status='ok')
+
+@server.route('/readyz')
+def readyz():
+    """ Readiness: answers 200 once the warm-up is done, 503 before,
+    with the duration of the warm-up and of each of its steps."""
+    status = warm_up.status()
+    return jsonify(status), 200 if status['ready'] else 503
 
    
 """ Run the app. """
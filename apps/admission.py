@@ -0,0 +1,247 @@
+import math, time, threading
+
+from apps import metrics
+
+""" Admission control of the requests, so that a few clients can't saturate the worker
+threads: the number of requests of a route handled at once is limited, the others waiting
+in a bounded queue and being rejected at once when it is full, and each client is given a
+token bucket per route, limiting its request rate.
+Routes are path prefixes (e.g. /export), or for callback requests the path followed by #
+and the output of the callback (e.g. /_dash-update-component#output.children), the most
+specific rule of a request applying."""
+
+""" Maximum number of token buckets kept per route, the full ones being dropped beyond."""
+MAX_CLIENTS = 10000
+
+
+def parse_rules(text, parse=float):
+    """ Parses comma-separated route=value rules, e.g. '/export=2,/images=2'.
+
+    Parameters
+    ----------
+    text : str
+        Rules.
+    parse : function
+        Converts the values.
+    """
+    rules = {}
+    for rule in text.split(','):
+        if rule.strip():
+            route, value = rule.rsplit('=', 1)
+            rules[route.strip()] = parse(value.strip())
+    return rules
+
+def parse_rate(value):
+    """ Parses a rate limit given as rate/burst, e.g. '10/30': 10 requests
+    per second on average, with bursts of up to 30 requests.
+
+    Parameters
+    ----------
+    value : str
+    """
+    rate, burst = value.split('/')
+    return float(rate), float(burst)
+
+def match(rules, path, output=''):
+    """ Returns the route of the rule applying to a request: the path and the callback
+    output, else the longest prefix of the path, None if no rule applies.
+
+    Parameters
+    ----------
+    rules : dict
+        Rules by route.
+    path : str
+        Path of the request.
+    output : str
+        Output of the callback, for callback requests.
+    """
+    if output and path + '#' + output in rules:
+        return path + '#' + output
+    prefixes = [route for route in rules if '#' not in route and path.startswith(route)]
+    return max(prefixes, key=len) if prefixes else None
+
+
+class Gate:
+    """ Limits the number of requests handled at once, with a bounded wait queue.
+
+    Attributes
+    ----------
+    self.limit : int
+        Number of requests handled at once.
+    self.queue : int
+        Number of requests waiting at most.
+    self.timeout : float
+        Maximum wait in seconds.
+    self.active : int
+        Number of requests being handled.
+    self.waiting : int
+        Number of requests waiting.
+    """
+    def __init__(self, limit, queue, timeout):
+        """ Initializes an idle gate.
+
+        Parameters
+        ----------
+        limit : int
+            Number of requests handled at once.
+        queue : int
+            Number of requests waiting at most.
+        timeout : float
+            Maximum wait in seconds.
+        """
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """ Waits for a slot. Returns the wait in seconds, or None if the request
+        is rejected, the queue being full or the wait too long."""
+        with self.condition:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                return 0.0
+            if self.waiting >= self.queue:
+                return None
+            self.waiting += 1
+            start = time.monotonic()
+            try:
+                while self.active >= self.limit:
+                    remaining = start + self.timeout - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+                self.active += 1
+                return time.monotonic() - start
+            finally:
+                self.waiting -= 1
+                if self.active < self.limit:
+                    self.condition.notify()  # a slot freed while timing out goes to the next request
+
+    def release(self):
+        """ Frees the slot of a handled request."""
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+
+class TokenBuckets:
+    """ Rate limits the requests of each client with a token bucket: a request takes
+    a token, tokens being added at a constant rate up to the size of the bucket.
+
+    Attributes
+    ----------
+    self.rate : float
+        Tokens added per second.
+    self.burst : float
+        Size of the buckets.
+    self.buckets : dict
+        (tokens, time of the last update) by client.
+    """
+    def __init__(self, rate, burst):
+        """ Initializes rate limits without clients.
+
+        Parameters
+        ----------
+        rate : float
+            Tokens added per second.
+        burst : float
+            Size of the buckets.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, client):
+        """ Takes a token from the bucket of a client. Returns 0 if the request
+        is allowed, else the number of seconds before the next token.
+
+        Parameters
+        ----------
+        client : str
+            Address of the client.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self.buckets[client] = (tokens, now)
+                return (1 - tokens) / self.rate if self.rate > 0 else math.inf
+            self.buckets[client] = (tokens - 1, now)
+            if len(self.buckets) > MAX_CLIENTS:
+                self.buckets = {c: (t, l) for c, (t, l) in self.buckets.items()
+                    if t + (now - l) * self.rate < self.burst}
+            return 0
+
+
+class AdmissionControl:
+    """ Admits or rejects requests according to the concurrency limits and the
+    rate limits of their routes.
+
+    Attributes
+    ----------
+    self.gates : dict
+        Gate of each limited route.
+    self.rates : dict
+        TokenBuckets of each rate limited route.
+    """
+    def __init__(self, limits, rates, queue, timeout):
+        """ Initializes the admission control.
+
+        Parameters
+        ----------
+        limits : str
+            Number of requests handled at once by route, e.g. '/export=2,/images=2'.
+        rates : str
+            Rate limit per client by route, as rate/burst, e.g. '/_dash-update-component=10/30'.
+        queue : int
+            Number of requests waiting at most per route.
+        timeout : float
+            Maximum wait in seconds.
+        """
+        self.gates = {route: Gate(limit, queue, timeout) for route, limit in parse_rules(limits, int).items()}
+        self.rates = {route: TokenBuckets(*rate) for route, rate in parse_rules(rates, parse_rate).items()}
+
+    def admit(self, path, output, client):
+        """ Admits a request. Returns the gate to release once the request is handled
+        (None if its route isn't limited) when it is admitted, else the status code
+        of the rejection, 429 when the client exceeds its rate and 503 when the route
+        is saturated, and the number of seconds to wait before retrying.
+
+        Parameters
+        ----------
+        path : str
+            Path of the request.
+        output : str
+            Output of the callback, for callback requests.
+        client : str
+            Address of the client.
+        """
+        route = match(self.rates, path, output)
+        if route is not None:
+            wait = self.rates[route].take(client)
+            if wait:
+                metrics.increment('admission_rejected', 'rate_limited ' + route)
+                return None, 429, math.ceil(min(wait, 3600))
+
+        route = match(self.gates, path, output)
+        if route is None:
+            return None, None, None
+        gate = self.gates[route]
+        wait = gate.acquire()
+        if wait is None:
+            metrics.increment('admission_rejected', 'saturated ' + route)
+            return None, 503, 1
+        if wait > 0:
+            metrics.increment('admission_queued', route)
+            metrics.observe('admission_wait_seconds', route, wait)
+        return gate, None, None
+
+    def stats(self):
+        """ Returns the limit and the numbers of active and waiting requests of each route."""
+        return {route: {'limit': gate.limit, 'active': gate.active, 'waiting': gate.waiting}
+            for route, gate in self.gates.items()}
@@ -0,0 +1,109 @@
+import functools, threading
+from collections import OrderedDict
+
+
+class Memoized:
+    """ Least-recently-used cache of a function, like functools.lru_cache,
+    whose entries can also be updated or invalidated selectively when
+    the data they were computed from changes.
+
+    Attributes
+    ----------
+    self.func : function
+        Cached function. Its arguments must be hashable.
+    self.maxsize : int
+        Maximum number of entries.
+    self.entries : OrderedDict
+        Cached results, keyed by arguments, least recently used first.
+    self.hits : int
+        Number of calls answered from the cache.
+    self.misses : int
+        Number of calls computed.
+    self.lock : threading.Lock
+        Lock of the entries, shared by the threads of the server. Results are
+        computed outside of it, so a result may be computed twice at once.
+    """
+    def __init__(self, func, maxsize):
+        """ Initializes instance variables.
+
+        Parameters
+        ----------
+        func : function
+            Cached function.
+        maxsize : int
+            Maximum number of entries.
+        """
+        self.func = func
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args):
+        with self.lock:
+            if args in self.entries:
+                self.entries.move_to_end(args)
+                self.hits += 1
+                return self.entries[args]
+            self.misses += 1
+        result = self.func(*args)
+        with self.lock:
+            self.entries[args] = result
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self.entries)
+
+    def items(self):
+        """ Returns a copy of the cached (arguments, result) pairs."""
+        with self.lock:
+            return list(self.entries.items())
+
+    def update(self, func):
+        """ Replaces each cached result by func(args, result), or drops it when func returns None.
+
+        Parameters
+        ----------
+        func : function
+            Takes the arguments and the cached result, returns the new result.
+        """
+        with self.lock:
+            for args in list(self.entries):
+                result = func(args, self.entries[args])
+                if result is None:
+                    del self.entries[args]
+                else:
+                    self.entries[args] = result
+
+    def invalidate(self, predicate):
+        """ Drops the cached results whose arguments satisfy the predicate.
+
+        Parameters
+        ----------
+        predicate : function
+            Takes the arguments, returns True if the result is outdated.
+        """
+        with self.lock:
+            for args in [args for args in self.entries if predicate(*args)]:
+                del self.entries[args]
+
+    def cache_clear(self):
+        """ Drops every cached result."""
+        with self.lock:
+            self.entries.clear()
+
+def memoize(maxsize=256):
+    """ Decorates a function with a selectively invalidable cache.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries.
+    """
+    def decorator(func):
+        return Memoized(func, maxsize)
+    return decorator
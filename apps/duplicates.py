@@ -0,0 +1,322 @@
+import re, zlib, unicodedata
+import numpy as np
+
+""" MinHash signatures: number of hash functions, split into LSH bands of
+BAND_ROWS hashes. Two records whose Jaccard similarity is s share a band with
+probability 1 - (1 - s^BAND_ROWS)^(NUM_HASHES / BAND_ROWS), about 0.5 for s = 0.45."""
+NUM_HASHES = 64
+BAND_ROWS = 4
+PRIME = 2**31 - 1
+
+""" Weights of the name, creators and tags similarities in the score of a pair,
+the tags being left out of the records without tags, and bonus of a shared DOI,
+in proportion to the name similarity."""
+WEIGHTS = {'name': 0.5, 'creators': 0.3, 'tags': 0.2}
+TEXT_WEIGHTS = {'name': 0.6, 'creators': 0.4, 'tags': 0.0}
+DOI_BONUS = 0.2
+
+""" Words left out of the creators."""
+STOPWORDS = {'and', 'et', 'al', 'with'}
+
+rng = np.random.default_rng(0)
+A = rng.integers(1, PRIME, NUM_HASHES, dtype=np.int64)
+B = rng.integers(0, PRIME, NUM_HASHES, dtype=np.int64)
+
+
+def normalize_doi(link):
+    """ Returns the DOI of a hyperlink in lowercase, None if it has none.
+    doi.org urls, 'doi:' prefixes and bare DOIs give the same DOI.
+
+    Parameters
+    ----------
+    link : str
+        Hyperlink of an installation.
+    """
+    match = re.search(r'10\.\d{4,9}/[^\s?#]+', str(link))
+    return match.group(0).rstrip('.,;/').lower() if match else None
+
+def words(text):
+    """ Splits a text into lowercase words without accents.
+
+    Parameters
+    ----------
+    text : str
+    """
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+def name_features(name):
+    """ Returns the character trigrams of a name, robust to small spelling changes.
+
+    Parameters
+    ----------
+    name : str
+    """
+    text = ' '.join(words(name))
+    return {text[i:i + 3] for i in range(max(1, len(text) - 2))} if text else set()
+
+def creator_features(creators):
+    """ Returns the words of the creators, initials and stopwords left out.
+
+    Parameters
+    ----------
+    creators : str
+    """
+    return {word for word in words(creators) if len(word) > 1 and word not in STOPWORDS}
+
+def minhash(features):
+    """ Returns the MinHash signature of a set of strings, -1 for an empty set.
+
+    Parameters
+    ----------
+    features : set
+    """
+    if not features:
+        return np.full(NUM_HASHES, -1, dtype=np.int64)
+    hashes = np.array([zlib.crc32(f.encode()) for f in features], dtype=np.int64)
+    return ((A[:, np.newaxis] * hashes + B[:, np.newaxis]) % PRIME).min(axis=1)
+
+def agreement(signatures, signature):
+    """ Estimates the Jaccard similarity between a signature and each row of
+    an array of signatures: the share of hash functions giving the same minimum.
+    Empty sets have no similarity.
+
+    Parameters
+    ----------
+    signatures : numpy array
+        Array of shape (number of records, NUM_HASHES).
+    signature : numpy array
+    """
+    if signature[0] < 0:
+        return np.zeros(len(signatures))
+    return (signatures == signature).mean(axis=1) * (signatures[:, 0] >= 0)
+
+def tag_jaccard(tags, vector):
+    """ Computes the Jaccard similarity between a tag vector and each row of a tag matrix.
+
+    Parameters
+    ----------
+    tags : numpy array
+        Binary array of shape (number of records, number of tags).
+    vector : numpy array
+        Binary tag vector.
+    """
+    inter = (tags & vector).sum(axis=1, dtype=np.float64)
+    union = (tags | vector).sum(axis=1, dtype=np.float64)
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class DuplicateIndex:
+    """ Finds the likely duplicates of a record among the indexed installations
+    without comparing it to all of them: candidates share a DOI, or a band of the
+    MinHash signature of their name (locality-sensitive hashing), and only
+    the candidates are scored.
+
+    Attributes
+    ----------
+    self.ids : list
+        ID of each indexed installation, by position.
+    self.names : numpy array
+        MinHash signatures of the names.
+    self.creators : numpy array
+        MinHash signatures of the creators.
+    self.links : list
+        DOI of each indexed installation, None if it has none.
+    self.dois : dict
+        Positions of the installations citing each DOI.
+    self.buckets : dict
+        Positions of the installations by (band, band signature) of their name.
+    self.threshold : float
+        Minimum score of a likely duplicate.
+    """
+    def __init__(self, threshold=0.6):
+        """ Initializes an empty index.
+
+        Parameters
+        ----------
+        threshold : float
+            Minimum score of a likely duplicate.
+        """
+        self.ids = []
+        self.names = np.zeros((0, NUM_HASHES), dtype=np.int64)
+        self.creators = np.zeros((0, NUM_HASHES), dtype=np.int64)
+        self.links = []
+        self.dois = {}
+        self.buckets = {}
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.ids)
+
+    def signature(self, record):
+        """ Returns the DOI and the name and creators signatures of a record.
+        Missing fields (None or NaN) are left empty.
+
+        Parameters
+        ----------
+        record : dict or pandas series
+            Installation, with at least the Name, Creator(s) and Hyperlink fields.
+        """
+        field = lambda name: record.get(name) if isinstance(record.get(name), str) else ''
+        return (normalize_doi(field('Hyperlink')), minhash(name_features(field('Name'))),
+            minhash(creator_features(field('Creator(s)'))))
+
+    def bands(self, signature):
+        """ Returns the bucket keys of a name signature.
+
+        Parameters
+        ----------
+        signature : numpy array
+        """
+        if signature[0] < 0:
+            return []
+        return [(b, signature[b * BAND_ROWS:(b + 1) * BAND_ROWS].tobytes())
+            for b in range(NUM_HASHES // BAND_ROWS)]
+
+    def add(self, records):
+        """ Indexes new installations.
+
+        Parameters
+        ----------
+        records : pandas dataframe
+            Installations, with the columns of the csv.
+        """
+        fields = records[['Name', 'Creator(s)', 'Hyperlink']].to_dict('records')
+        self.insert(records['ID'].astype(int).tolist(), [self.signature(record) for record in fields])
+
+    def insert(self, ids, signed):
+        """ Indexes new installations from their signatures.
+
+        Parameters
+        ----------
+        ids : list
+            IDs of the installations.
+        signed : list
+            (DOI, name signature, creators signature) of each installation, as returned by signature.
+        """
+        start = len(self.ids)
+        self.ids += ids
+        if not signed:
+            return
+        self.names = np.concatenate([self.names, [s[1] for s in signed]])
+        self.creators = np.concatenate([self.creators, [s[2] for s in signed]])
+        self.links += [s[0] for s in signed]
+        for i, (doi, name, creators) in enumerate(signed, start):
+            self.post(i, doi, name)
+
+    def post(self, i, doi, name):
+        """ Adds an installation to the postings of its DOI and name bands.
+
+        Parameters
+        ----------
+        i : int
+            Position of the installation.
+        doi : str
+            DOI of the installation, None if it has none.
+        name : numpy array
+            Name signature of the installation.
+        """
+        if doi is not None:
+            self.dois.setdefault(doi, []).append(i)
+        for key in self.bands(name):
+            self.buckets.setdefault(key, []).append(i)
+
+    def replace(self, positions, records):
+        """ Re-indexes installations whose content changed.
+
+        Parameters
+        ----------
+        positions : list
+            Positions of the installations.
+        records : pandas dataframe
+            New content of the installations, with the columns of the csv.
+        """
+        fields = records[['Name', 'Creator(s)', 'Hyperlink']].to_dict('records')
+        for i, record in zip(positions, fields):
+            if self.links[i] is not None:
+                self.dois[self.links[i]].remove(i)
+            for key in self.bands(self.names[i]):
+                self.buckets[key].remove(i)
+            doi, name, creators = self.signature(record)
+            self.links[i], self.names[i], self.creators[i] = doi, name, creators
+            self.post(i, doi, name)
+
+    def remove(self, moved):
+        """ Removes installations, the next ones moving up.
+
+        Parameters
+        ----------
+        moved : numpy array
+            New position of each old position, -1 for removed installations.
+        """
+        keep = moved >= 0
+        self.ids = [ID for ID, kept in zip(self.ids, keep) if kept]
+        self.links = [doi for doi, kept in zip(self.links, keep) if kept]
+        self.names, self.creators = self.names[keep], self.creators[keep]
+        for postings in (self.dois, self.buckets):
+            for key in list(postings):
+                positions = [int(moved[i]) for i in postings[key] if moved[i] >= 0]
+                if positions:
+                    postings[key] = positions
+                else:
+                    del postings[key]
+
+    def candidates(self, doi, name):
+        """ Returns the sorted positions of the installations sharing a DOI
+        or a band of their name signature with a record.
+
+        Parameters
+        ----------
+        doi : str
+            DOI of the record, None if it has none.
+        name : numpy array
+            Name signature of the record.
+        """
+        found = set(self.dois.get(doi, [])) if doi is not None else set()
+        for key in self.bands(name):
+            found.update(self.buckets.get(key, []))
+        return np.array(sorted(found), dtype=np.int64)
+
+    def query(self, record, tags=None, vector=None, signed=None, before=None):
+        """ Returns the likely duplicates of a record, best first, as dicts holding
+        the ID of the installation, the score, whether the DOI is shared and the
+        similarity of each field.
+        The score adds the similarities of the name, creators and tags, weighted
+        by WEIGHTS, or TEXT_WEIGHTS without tag vector. A shared DOI alone isn't
+        enough, several installations of the same creators being described in the
+        same publication: its bonus is proportional to the name similarity.
+
+        Parameters
+        ----------
+        record : dict or pandas series
+            Installation, with at least the Name, Creator(s) and Hyperlink fields.
+        tags : numpy array, optional
+            Tag matrix of the indexed installations, by position.
+        vector : numpy array, optional
+            Tag vector of the record, in the columns of tags.
+        signed : tuple, optional
+            Signature of the record when already computed.
+        before : int, optional
+            Position before which the installations are considered, all of them by default.
+        """
+        doi, name, creators = signed if signed is not None else self.signature(record)
+        positions = self.candidates(doi, name)
+        if before is not None:
+            positions = positions[positions < before]
+        if len(positions) == 0:
+            return []
+
+        similarity = {
+            'name': agreement(self.names[positions], name),
+            'creators': agreement(self.creators[positions], creators),
+            'tags': tag_jaccard(tags[positions], vector) if vector is not None else np.zeros(len(positions)),
+        }
+        weights = WEIGHTS if vector is not None else TEXT_WEIGHTS
+        score = sum(weights[field] * similarity[field] for field in weights)
+        same_doi = np.array([i in self.dois.get(doi, ()) for i in positions], dtype=bool)
+        score = np.minimum(1.0, score + DOI_BONUS * same_doi * similarity['name'])
+
+        found = np.flatnonzero(score >= self.threshold)
+        found = found[np.argsort(-score[found], kind='stable')]
+        return [{'ID': self.ids[positions[j]], 'score': round(float(score[j]), 3), 'doi': bool(same_doi[j]),
+            'similarity': {field: round(float(similarity[field][j]), 3) for field in similarity}} for j in found]
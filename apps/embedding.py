@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class Embedding:
+    """ 2D projection of the tag vectors of the installations, placing installations
+    with similar tags close together. Fitted once on the tag matrix with NumPy
+    linear algebra, new installations being projected without refitting.
+
+    Attributes
+    ----------
+    self.method : str
+        'pca' (principal components of the tag matrix) or 'mds'
+        (classical multidimensional scaling of the Jaccard distances).
+    self.reference : numpy array
+        Tag vectors the projection was fitted on, kept for 'mds' only.
+    self.mean : numpy array
+        Mean tag vector for 'pca', mean squared distance to each reference
+        installation for 'mds'.
+    self.axes : numpy array
+        Projection axes, array of shape (number of tags or references, 2).
+    self.coords : numpy array
+        Coordinates of the installations the projection was fitted on.
+    """
+    def __init__(self, tags, method='pca'):
+        """ Fits the projection.
+
+        Parameters
+        ----------
+        tags : numpy array
+            Binary array of shape (number of installations, number of tags).
+        method : str
+            'pca' or 'mds'.
+        """
+        self.method = method
+        self.reference = None
+        matrix = tags.astype(np.float64)
+
+        if method == 'pca':
+            self.mean = matrix.mean(axis=0)
+            u, s, vt = np.linalg.svd(matrix - self.mean, full_matrices=False)
+            self.axes = vt[:2].T
+        elif method == 'mds':
+            self.reference = matrix
+            sq = jaccard_distances(matrix, matrix) ** 2
+            self.mean = sq.mean(axis=0)
+            centered = sq - self.mean - self.mean[:, np.newaxis] + self.mean.mean()
+            eigenvalues, eigenvectors = np.linalg.eigh(-0.5 * centered)
+            top = np.argsort(eigenvalues)[::-1][:2]
+            self.axes = eigenvectors[:, top] / np.sqrt(np.maximum(eigenvalues[top], 1e-12))
+        else:
+            raise ValueError('Unknown projection method: ' + str(method))
+
+        # Fixing the sign of each axis so that the map does not flip between builds
+        coords = self.transform(tags)
+        signs = np.sign(coords[np.abs(coords).argmax(axis=0), [0, 1]])
+        signs[signs == 0] = 1
+        self.axes = self.axes * signs
+        self.coords = coords * signs
+
+    def transform(self, tags):
+        """ Returns the coordinates of installations in the fitted projection.
+
+        Parameters
+        ----------
+        tags : numpy array
+            Binary array of shape (number of installations, number of tags).
+        """
+        matrix = tags.astype(np.float64)
+        if self.method == 'pca':
+            return (matrix - self.mean) @ self.axes
+        # Out-of-sample classical scaling from the distances to the reference installations
+        sq = jaccard_distances(matrix, self.reference) ** 2
+        return -0.5 * (sq - self.mean) @ self.axes
+
+def jaccard_distances(a, b):
+    """ Computes the Jaccard distance between every row of a and every row of b.
+
+    Parameters
+    ----------
+    a, b : numpy array
+        Binary arrays of shape (number of installations, number of tags).
+    """
+    inter = a @ b.T
+    union = a.sum(axis=1)[:, np.newaxis] + b.sum(axis=1)[np.newaxis, :] - inter
+    return 1 - np.divide(inter, union, out=np.ones_like(inter), where=union > 0)
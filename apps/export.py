@@ -0,0 +1,164 @@
+import io, re, json, html
+import pandas as pd
+
+from apps.schema import doi_to_url
+
+""" Number of installations serialized at once by the writers."""
+CHUNK_SIZE = 500
+
+
+def chunks(data, rows, size=CHUNK_SIZE, progress=None):
+    """ Yields the selected installations by slices of at most size rows,
+    so that exports never hold more than one slice in memory.
+
+    Parameters
+    ----------
+    data : pandas dataframe or snapshot
+        Data from csv file.
+    rows : numpy array
+        Positions of the installations to export.
+    size : int
+        Number of installations per slice.
+    progress : function, optional
+        Called with the number of installations serialized after each slice.
+    """
+    for start in range(0, len(rows), size):
+        yield data.take(rows[start:start + size])
+        if progress is not None:
+            progress(min(start + size, len(rows)))
+
+def records(chunk):
+    """ Returns the installations of a chunk as dicts, missing values (NaN) being None.
+
+    Parameters
+    ----------
+    chunk : pandas dataframe
+        Installations, with the columns of the database.
+    """
+    return chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+
+def csv_lines(data, rows, progress=None):
+    """ Streams the selected installations as csv, with the columns of the database.
+
+    Parameters
+    ----------
+    data : pandas dataframe or snapshot
+        Data from csv file.
+    rows : numpy array
+        Positions of the installations to export.
+    progress : function, optional
+        Called with the number of installations serialized after each chunk.
+    """
+    yield data.take([]).to_csv(index=False)
+    for chunk in chunks(data, rows, progress=progress):
+        yield chunk.to_csv(index=False, header=False)
+
+def json_lines(data, rows, progress=None):
+    """ Streams the selected installations as JSON Lines, one object per installation.
+
+    Parameters
+    ----------
+    data : pandas dataframe or snapshot
+        Data from csv file.
+    rows : numpy array
+        Positions of the installations to export.
+    progress : function, optional
+        Called with the number of installations serialized after each chunk.
+    """
+    for chunk in chunks(data, rows, progress=progress):
+        buffer = io.StringIO()
+        for record in records(chunk):
+            buffer.write(json.dumps(record, ensure_ascii=False, allow_nan=False, default=str) + '\n')
+        yield buffer.getvalue()
+
+def bibtex_escape(text):
+    """ Escapes the characters having a special meaning in BibTeX fields.
+
+    Parameters
+    ----------
+    text : str
+    """
+    return re.sub(r'([&%$#_{}])', r'\\\1', str(text))
+
+def bibtex_entry(record):
+    """ Formats an installation as a BibTeX entry, built from its
+    reference, publication, year and hyperlink. Missing fields are left out.
+
+    Parameters
+    ----------
+    record : dict
+        Installation, with the columns of the database as keys.
+    """
+    record = {name: '' if value is None or pd.isna(value) else value for name, value in record.items()}
+    key = re.sub(r'\W', '', str(record['References'])) + '_' + str(record['ID'])
+    kind = str(record['Type']).strip()
+    if kind.startswith('Journal'):
+        entry, venue = 'article', 'journal'
+    elif kind.startswith('Proceedings'):
+        entry, venue = 'inproceedings', 'booktitle'
+    elif kind.startswith('Book'):
+        entry, venue = 'book', 'publisher'
+    else:
+        entry, venue = 'misc', 'howpublished'
+
+    creators = re.sub(r',?\s*et al\.?\s*$', ', others', str(record['Creator(s)']))
+    authors = [a for a in re.split(r'\s*[,;]\s*', creators) if a]
+
+    fields = [
+        ('title', bibtex_escape(record['Name'].strip('"'))),
+        ('author', bibtex_escape(' and '.join(authors))),
+        (venue, bibtex_escape(record['Publication'])),
+        ('year', str(record['Year'])[:4]),
+        ('url', doi_to_url(str(record['Hyperlink']))),
+        ('note', bibtex_escape(record['References'])),
+    ]
+    return ('@' + entry + '{' + key + ',\n'
+        + ',\n'.join('  ' + name + ' = {' + value + '}' for name, value in fields if value.strip())
+        + '\n}\n\n')
+
+def bibtex_entries(data, rows, progress=None):
+    """ Streams the selected installations as BibTeX entries.
+
+    Parameters
+    ----------
+    data : pandas dataframe or snapshot
+        Data from csv file.
+    rows : numpy array
+        Positions of the installations to export.
+    progress : function, optional
+        Called with the number of installations serialized after each chunk.
+    """
+    for chunk in chunks(data, rows, progress=progress):
+        yield ''.join(bibtex_entry(record) for record in records(chunk))
+
+def html_page(data, rows, title):
+    """ Streams the selected installations as a standalone html page holding a table,
+    the server-rendered variant of the results list.
+
+    Parameters
+    ----------
+    data : pandas dataframe or snapshot
+        Data from csv file.
+    rows : numpy array
+        Positions of the installations to list.
+    title : str
+        Title of the page.
+    """
+    yield ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>' + html.escape(title)
+        + '</title></head><body>\n<h1>' + html.escape(title) + '</h1>\n<p>' + str(len(rows))
+        + ' results</p>\n<table>\n<tr><th>Name</th><th>Creator(s)</th><th>Year</th><th>Source</th></tr>\n')
+    for chunk in chunks(data, rows):
+        yield ''.join(
+            '<tr><td><a href="' + html.escape(doi_to_url(str(link))) + '">' + html.escape(str(name))
+            + '</a></td><td>' + html.escape(str(creators)) + '</td><td>' + html.escape(str(year))
+            + '</td><td>' + html.escape(str(publication)) + '</td></tr>\n'
+            for name, creators, year, publication, link in zip(chunk['Name'], chunk['Creator(s)'],
+                chunk['Year'], chunk['Publication'], chunk['Hyperlink']))
+    yield '</table>\n</body></html>\n'
+
+""" Export formats: writer, mimetype and file extension."""
+FORMATS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'jsonl': (json_lines, 'application/x-ndjson', 'jsonl'),
+    'bibtex': (bibtex_entries, 'application/x-bibtex', 'bib'),
+}
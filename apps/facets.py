@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from apps.trends import start_years
+
+""" Columns counted as facets besides the tags, and width of the year buckets."""
+FACET_COLUMNS = ['Publication', 'Type', 'Source']
+DECADE = 10
+
+
+class FacetIndex:
+    """ Facets of the installations: tags, publication, type, source and decade.
+    Each installation has one value of every facet besides the tags, stored as
+    the code of its column. The facet counts of any set of installations are obtained
+    by counting the codes of the set, and its tags from the tag matrix, so that memory
+    doesn't grow with the number of distinct publications.
+
+    Attributes
+    ----------
+    self.facets : list
+        (facet, value) of each column of the counts, the facet of tags being 'Tag'.
+    self.columns : dict
+        Column of each (facet, value).
+    self.k : int
+        Number of tag columns, the first ones of the counts.
+    self.codes : numpy array
+        Array of shape (capacity, number of facets besides the tags), holding the
+        column of the value of each facet of each installation.
+    self.n : int
+        Number of installations.
+    """
+    def __init__(self, tagcols):
+        """ Initializes the index with the tag columns.
+
+        Parameters
+        ----------
+        tagcols : list
+            Tag column of each column of the tag matrix.
+        """
+        self.facets = [('Tag', col) for col in tagcols]
+        self.columns = {facet: j for j, facet in enumerate(self.facets)}
+        self.k = len(tagcols)
+        self.codes = np.zeros((0, len(FACET_COLUMNS) + 1), dtype=np.int32)
+        self.n = 0
+
+    def values(self, new):
+        """ Returns the (facet, value) pairs of new installations, besides their tags.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Installations, with the columns of the csv.
+        """
+        pairs = {col: [(col, 'Unknown' if pd.isna(value) else str(value).strip()) for value in new[col]]
+            for col in FACET_COLUMNS}
+        decades = start_years(new['Year']) // DECADE * DECADE
+        pairs['Year'] = [('Year', '{}s'.format(decade) if decade >= 0 else 'Unknown') for decade in decades]
+        return pairs
+
+    def add(self, new):
+        """ Adds the facets of new installations, and columns for the facet values
+        they introduce.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Installations, with the columns of the csv.
+        """
+        size = self.n + len(new)
+        if size > len(self.codes):
+            grown = np.zeros((max(size, 2 * len(self.codes)), self.codes.shape[1]), dtype=np.int32)
+            grown[:self.n] = self.codes[:self.n]
+            self.codes = grown
+        self.set(np.arange(self.n, size), self.values(new))
+        self.n = size
+
+    def set(self, rows, pairs):
+        """ Sets the codes of installations, adding the columns of new facet values.
+
+        Parameters
+        ----------
+        rows : numpy array
+            Positions of the installations.
+        pairs : dict
+            (facet, value) pairs of the installations, as returned by values.
+        """
+        for facet in sorted(set(pair for column in pairs.values() for pair in column) - set(self.columns)):
+            self.columns[facet] = len(self.facets)
+            self.facets.append(facet)
+        for j, column in enumerate(pairs.values()):
+            self.codes[rows, j] = [self.columns[pair] for pair in column]
+
+    def replace(self, rows, new):
+        """ Replaces the facets of installations whose content changed.
+
+        Parameters
+        ----------
+        rows : numpy array
+            Positions of the installations.
+        new : pandas dataframe
+            New content of the installations, with the columns of the csv.
+        """
+        self.set(rows, self.values(new))
+
+    def remove(self, keep):
+        """ Removes installations, the next ones moving up.
+
+        Parameters
+        ----------
+        keep : numpy array
+            Boolean mask of the installations kept.
+        """
+        self.codes = self.codes[:self.n][keep]
+        self.n = len(self.codes)
+
+    def counts(self, mask, tags):
+        """ Returns the number of installations of the mask having each facet value.
+
+        Parameters
+        ----------
+        mask : numpy array
+            Boolean mask of the installations.
+        tags : numpy array
+            Binary tag matrix of the installations.
+        """
+        counts = np.bincount(self.codes[:self.n][mask].ravel(), minlength=len(self.facets)).astype(np.int64)
+        counts[:self.k] = tag_counts(mask, tags)
+        return counts
+
+
+def tag_counts(mask, tags):
+    """ Returns the number of installations of the mask carrying each tag.
+
+    Parameters
+    ----------
+    mask : numpy array
+        Boolean mask of the installations.
+    tags : numpy array
+        Binary tag matrix of the installations.
+    """
+    return tags.sum(axis=0, where=mask[:, np.newaxis], dtype=np.int64)
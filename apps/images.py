@@ -0,0 +1,149 @@
+import os, shutil, hashlib, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import plotly.io as pio
+
+""" Static images of the sunbursts, rendered by Plotly's exporter (kaleido) in a pool of
+processes, the exporter being slow and single-threaded. Images are cached on disk, in a
+directory per version of the dataset, under the hash of their figure: an image is rendered
+once per version and served as is afterwards."""
+
+""" Image formats: mimetype."""
+FORMATS = {'svg': 'image/svg+xml', 'png': 'image/png', 'pdf': 'application/pdf'}
+
+""" Size of the images in pixels, and scale of the png images."""
+WIDTH = 900
+HEIGHT = 900
+SCALE = 2
+
+
+def figure_hash(spec, fmt):
+    """ Returns the hash of an image: its figure, format and size.
+
+    Parameters
+    ----------
+    spec : str
+        Figure serialized as json.
+    fmt : str
+        Image format.
+    """
+    return hashlib.sha1('{}|{}x{}x{}|'.format(fmt, WIDTH, HEIGHT, SCALE).encode() + spec.encode()).hexdigest()[:16]
+
+def render(spec, path, fmt):
+    """ Renders a figure to an image file. Runs in the worker processes.
+    The image is written under a temporary name then renamed, so that
+    a partially written file is never served.
+
+    Parameters
+    ----------
+    spec : str
+        Figure serialized as json.
+    path : str
+        Path of the image.
+    fmt : str
+        Image format.
+    """
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    os.makedirs(os.path.dirname(path), exist_ok=True)  # in case the version was pruned meanwhile
+    pio.write_image(pio.from_json(spec, skip_invalid=True), temporary, format=fmt,
+        width=WIDTH, height=HEIGHT, scale=SCALE if fmt == 'png' else 1)
+    os.replace(temporary, path)
+    return path
+
+
+class ImageCache:
+    """ Renders static images of figures in parallel and keeps them on disk.
+
+    Attributes
+    ----------
+    self.directory : str
+        Directory of the images, holding one sub-directory per version of the dataset.
+    self.workers : int
+        Number of rendering processes, by default the number of cpus.
+    self.pool : ProcessPoolExecutor
+        Rendering processes, started by start or on the first render.
+    """
+    def __init__(self, directory, workers=None):
+        """ Initializes a cache without rendering processes.
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the images.
+        workers : int, optional
+            Number of rendering processes.
+        """
+        self.directory = directory
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """ Returns the rendering processes, starting them all at once if needed.
+        The processes are forked: a threaded server must start them before its
+        threads, as a process forked while another thread holds a lock inherits
+        it held for good."""
+        with self.lock:
+            if self.pool is None:
+                method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+                self.pool.submit(os.getpid).result()  # forks every worker
+            return self.pool
+
+    def export(self, figures, formats, version):
+        """ Returns the paths of the images of figures in several formats, in the
+        order of the figures then of the formats. Only the images not on disk yet
+        are rendered, in parallel.
+
+        Parameters
+        ----------
+        figures : list
+            (name, figure) of each figure, the name starting the file names.
+        formats : list
+            Image formats.
+        version : str
+            Version of the dataset the figures were built from.
+        """
+        folder = os.path.join(self.directory, version)
+        os.makedirs(folder, exist_ok=True)
+        paths, jobs = [], {}
+        for name, figure in figures:
+            spec = pio.to_json(figure, validate=False)
+            for fmt in formats:
+                path = os.path.join(folder, '{}-{}.{}'.format(name, figure_hash(spec, fmt), fmt))
+                paths.append(path)
+                if not os.path.exists(path):
+                    jobs[path] = (spec, path, fmt)
+        if jobs:
+            pool = self.start()
+            for future in [pool.submit(render, *job) for job in jobs.values()]:
+                future.result()
+        return paths
+
+    def get(self, name, figure, fmt, version):
+        """ Returns the path of the image of a figure, rendering it if it isn't on disk.
+
+        Parameters
+        ----------
+        name : str
+            Start of the file name.
+        figure : plotly figure
+        fmt : str
+            Image format.
+        version : str
+            Version of the dataset the figure was built from.
+        """
+        return self.export([(name, figure)], [fmt], version)[0]
+
+    def prune(self, version):
+        """ Deletes the images of the other versions of the dataset.
+
+        Parameters
+        ----------
+        version : str
+            Current version of the dataset.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for folder in os.listdir(self.directory):
+            if folder != version:
+                shutil.rmtree(os.path.join(self.directory, folder), ignore_errors=True)
@@ -0,0 +1,260 @@
+import sys, json, time, argparse
+import numpy as np
+import pandas as pd
+
+from apps.schema import DATA_PATH, BINARY_COLUMNS, row_errors, compact, normalize_link
+from apps.query import Database
+
+"""
+Bulk import of installations from a csv or JSON Lines file (one installation
+per line), read in chunks rather than at once. Each record is validated against
+the taxonomy columns, its hyperlink normalized, and the valid ones appended to the
+csv of the dataset and to its compiled snapshot, against which the next chunks are
+checked for existing IDs and duplicates: memory grows with the number of records
+imported, as when the app loads the csv. Invalid records are reported without
+aborting the import.
+
+Example: python -m apps.importer new_installations.jsonl --errors errors.jsonl
+"""
+
+""" Number of records read, validated and written at once."""
+CHUNK_SIZE = 1000
+
+
+def read_chunks(path, size=CHUNK_SIZE):
+    """ Yields the records of a csv or JSON Lines file (.jsonl, .ndjson) as dataframes
+    of at most size rows, indexed by their line number in the file. Records that
+    aren't valid json are yielded as (line number, message) errors, in a list
+    after each chunk.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    size : int
+        Number of records of each chunk.
+    """
+    if not path.endswith(('.jsonl', '.ndjson')):
+        for chunk in pd.read_csv(path, chunksize=size, dtype=str, encoding='utf-8-sig'):
+            chunk.index = chunk.index + 2  # after the header line
+            yield chunk, []
+        return
+
+    records, lines, errors = [], [], []
+    with open(path, encoding='utf-8-sig') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('expected an object')
+                records.append(record)
+                lines.append(number)
+            except ValueError as e:
+                errors.append((number, 'Invalid json: ' + str(e)))
+            if len(records) + len(errors) >= size:
+                yield pd.DataFrame(records, index=lines, dtype=object), errors
+                records, lines, errors = [], [], []
+    if records or errors:
+        yield pd.DataFrame(records, index=lines, dtype=object), errors
+
+
+def append_csv(path, new, columns):
+    """ Appends installations to a csv, in the order of its columns.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    new : pandas dataframe
+        Compacted installations.
+    columns : list
+        Columns of the csv, in order.
+    """
+    new[list(columns)].to_csv(path, mode='a', header=False, index=False, lineterminator='\r\n')
+
+def csv_columns(path=DATA_PATH):
+    """ Returns the columns of a csv, in order.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    """
+    return list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+
+
+class Importer:
+    """ Validates chunks of records and appends the valid ones to the csv and the snapshot.
+
+    Attributes
+    ----------
+    self.snapshot : Snapshot
+        Compiled snapshot of the dataset, checked for existing IDs and duplicates.
+    self.path : str
+        Path of the csv written, None for a dry run.
+    self.columns : list
+        Columns of the csv, in order.
+    self.duplicates : bool
+        Whether likely duplicates are imported anyway.
+    self.next_id : int
+        ID given to the next record without ID.
+    self.imported : int
+        Number of records imported.
+    self.errors : list
+        (line, ID, message) of each rejected record.
+    """
+    def __init__(self, snapshot, path=None, columns=None, duplicates=False):
+        """ Initializes an import into a snapshot.
+
+        Parameters
+        ----------
+        snapshot : Snapshot
+            Compiled snapshot of the dataset.
+        path : str, optional
+            Path of the csv the records are appended to, None for a dry run.
+        columns : list, optional
+            Columns of the csv, in order, by default the ones of the snapshot.
+        duplicates : bool
+            Whether likely duplicates are imported anyway.
+        """
+        self.snapshot = snapshot
+        self.path = path
+        self.columns = list(columns if columns is not None else snapshot.segments[0].columns)
+        self.duplicates = duplicates
+        self.next_id = int(max(snapshot.rowof, default=0)) + 1
+        self.imported = 0
+        self.errors = []
+
+    def prepare(self, chunk):
+        """ Completes the records of a chunk: missing columns are left empty, missing
+        tags stand for 0, missing IDs are given the next free ones, and hyperlinks
+        are normalized.
+
+        Parameters
+        ----------
+        chunk : pandas dataframe
+            Records, indexed by line number.
+        """
+        chunk = chunk.reindex(columns=list(dict.fromkeys(self.columns + list(chunk.columns))))
+        chunk[BINARY_COLUMNS] = chunk[BINARY_COLUMNS].fillna(0)
+        chunk['ID'] = chunk['ID'].astype(object)
+        missing = chunk['ID'].isna() | (chunk['ID'].astype(str).str.strip() == '')
+        chunk.loc[missing, 'ID'] = np.arange(self.next_id, self.next_id + missing.sum())
+        chunk['Hyperlink'] = chunk['Hyperlink'].map(normalize_link)
+        return chunk
+
+    def check(self, chunk):
+        """ Returns the records of a chunk that can be imported, recording the others
+        in self.errors: schema violations, empty names, IDs already in the dataset
+        and, unless duplicates are allowed, likely duplicates.
+
+        Parameters
+        ----------
+        chunk : pandas dataframe
+            Prepared records, indexed by line number.
+        """
+        rejected = {}
+        for line, message in row_errors(chunk):
+            rejected.setdefault(line, message)
+        for line in chunk.index[chunk['Name'].isna() | (chunk['Name'].astype(str).str.strip() == '')]:
+            rejected.setdefault(line, 'Name must not be empty')
+        ids = pd.to_numeric(chunk['ID'], errors='coerce')
+        for line in chunk.index[ids.isin(list(self.snapshot.rowof))]:
+            rejected.setdefault(line, 'ID ' + str(chunk.loc[line, 'ID']) + ' is already in the database')
+
+        valid = chunk.drop(index=list(rejected))
+        valid['ID'] = pd.to_numeric(valid['ID']).astype(int)
+        if not self.duplicates and len(valid) > 0:
+            for i, matches in self.snapshot.find_duplicates(compact(valid)).items():
+                rejected[valid.index[i]] = 'Likely duplicate of ' + ', '.join(
+                    str(match['ID']) + ' (' + str(match['score']) + ')' for match in matches)
+            valid = valid.drop(index=[line for line in rejected if line in valid.index])
+
+        for line, message in sorted(rejected.items()):
+            self.errors.append((int(line), str(chunk.loc[line, 'ID']), message))
+        return valid
+
+    def write(self, valid):
+        """ Appends valid records to the csv and the snapshot.
+
+        Parameters
+        ----------
+        valid : pandas dataframe
+            Validated records.
+        """
+        new = compact(valid)
+        self.snapshot.append(new[self.columns])
+        if self.path is not None:
+            append_csv(self.path, new, self.columns)
+        self.next_id = max(self.next_id, int(new['ID'].max()) + 1)
+        self.imported += len(new)
+
+    def run(self, chunks, progress=None):
+        """ Imports chunks of records. Returns the number of records imported.
+
+        Parameters
+        ----------
+        chunks : iterable
+            (records, errors) of each chunk, as yielded by read_chunks.
+        progress : function, optional
+            Called after each chunk with the importer.
+        """
+        for chunk, errors in chunks:
+            self.errors += [(line, '', message) for line, message in errors]
+            if len(chunk) > 0:
+                valid = self.check(self.prepare(chunk))
+                if len(valid) > 0:
+                    self.write(valid)
+            if progress is not None:
+                progress(self)
+        return self.imported
+
+
+def compile_snapshot(path=DATA_PATH):
+    """ Compiles the snapshot of a csv, as the app does.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    """
+    return Database(path).snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description='Imports installations from a csv or JSON Lines file.')
+    parser.add_argument('source', help='csv or JSON Lines (.jsonl, .ndjson) file of installations')
+    parser.add_argument('--data', default=DATA_PATH, help='csv of the dataset the installations are appended to')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='number of records read at once')
+    parser.add_argument('--allow-duplicates', action='store_true', help='import likely duplicates anyway')
+    parser.add_argument('--dry-run', action='store_true', help='validate the records without writing them')
+    parser.add_argument('--errors', help='file where the rejected records are written as JSON Lines')
+    args = parser.parse_args()
+
+    snapshot = compile_snapshot(args.data)
+    importer = Importer(snapshot, None if args.dry_run else args.data, csv_columns(args.data), args.allow_duplicates)
+    start = time.perf_counter()
+
+    def progress(importer):
+        elapsed = time.perf_counter() - start
+        print('\r{} accepted, {} rejected, {:.0f} rows/s'.format(importer.imported, len(importer.errors),
+            (importer.imported + len(importer.errors)) / elapsed if elapsed else 0.0), end='', file=sys.stderr)
+
+    importer.run(read_chunks(args.source, args.chunk_size), progress)
+    elapsed = time.perf_counter() - start
+    rows = importer.imported + len(importer.errors)
+    print(file=sys.stderr)
+    print('{} of {} records {} in {:.2f} s ({:.0f} rows/s), {} rejected'.format(importer.imported, rows,
+        'valid' if args.dry_run else 'imported', elapsed, rows / elapsed if elapsed else 0.0, len(importer.errors)))
+    for line, ID, message in importer.errors[:20]:
+        print('line {}: {}'.format(line, message), file=sys.stderr)
+    if len(importer.errors) > 20:
+        print('... {} more'.format(len(importer.errors) - 20), file=sys.stderr)
+    if args.errors:
+        with open(args.errors, 'w', encoding='utf-8') as f:
+            for line, ID, message in importer.errors:
+                f.write(json.dumps({'line': line, 'ID': ID, 'error': message}) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import re
+import numpy as np
+
+
+def tag_nodes(objs):
+    """ Describes each leaf category of the sunburst objects as a
+    (dimension, category, label) node, keyed by tag column.
+
+    Parameters
+    ----------
+    objs : list
+        Sunburst objects (appObj) already initiated.
+    """
+    nodes = {}
+    for obj in objs:
+        labels = dict(zip(obj.df['ids'], obj.df['labels']))
+        for col, parent in zip(obj.df['ids'], obj.df['parents']):
+            if col in obj.leaves:
+                nodes[col] = (obj.name,
+                    re.sub('<br>', ' ', labels[parent]).strip(),
+                    re.sub('<br>', ' ', labels[col]).strip())
+    return nodes
+
+def reverse_index(ids, tags, tagcols, nodes):
+    """ Maps each installation onto the (dimension, category, label, tag column)
+    nodes of the tags it carries.
+    Built once from the non-zero entries of the tag matrix, so that looking up
+    the tags of an installation doesn't depend on the size of the taxonomy.
+
+    Parameters
+    ----------
+    ids : list
+        ID of each installation, in the order of the tag matrix rows.
+    tags : numpy array
+        Binary tag matrix of shape (number of installations, number of tags).
+    tagcols : list
+        Tag column of each column of the tag matrix.
+    nodes : dict
+        (dimension, category, label) node of each tag column.
+    """
+    index = {int(ID): [] for ID in ids}
+    rows, cols = np.nonzero(tags)
+    for i, j in zip(rows, cols):
+        index[int(ids[i])].append(nodes[tagcols[j]] + (tagcols[j],))
+    return index
@@ -2,28 +2,18 @@ import os, re
 import pandas as pd
 from dash import html, dcc
 
-data = pd.read_csv(os.path.join(os.getcwd(), 'data', 'installationsList.csv'))
+from apps.schema import DATA_PATH, load_data, doi_to_url
 
-def doi_to_url(link):
-    """ Converts the doi into a proper url.
-    If the input is a link, returns it unchanged.
+data = load_data(DATA_PATH)  # same arguments as the app, so that the csv is loaded once
+
+def make_list(data):
+    """ Creates the html rows of the input installations.
 
     Parameters
     ----------
-    link : str
-        Doi number.
+    data : pandas dataframe
+        Installations, with the columns of the csv.
     """
-    if re.match('10.', link):
-        return 'https://doi.org/' + link
-    elif re.match('DOI:', link):
-        return re.sub('DOI:', 'https://doi.org/', link)
-    elif re.match('doi:', link):
-        return re.sub('doi:', 'https://doi.org/', link)
-    else:
-        return link
-
-def make_list():
-    sections = []
     rows = []
 
     for i in range(0, len(data)):
@@ -39,7 +29,49 @@ def make_list():
         rows.append(html.Tr(row))
     return rows
 
-rows = make_list()
+rows = make_list(data)
+
+header = [html.Th(col) for col in ['Name', 'Creator(s)', 'Year', 'Source']]
+
+table = html.Table(
+        header
+        + rows
+)
+
+def append_rows(new):
+    """ Adds the rows of new installations to the list, without rebuilding the existing ones.
+
+    Parameters
+    ----------
+    new : pandas dataframe
+        Installations, with the columns of the csv.
+    """
+    table.children.extend(make_list(new))
+
+def replace_rows(positions, new):
+    """ Replaces the rows of installations whose content changed, the rows
+    being in the order of the installations in the snapshot.
+
+    Parameters
+    ----------
+    positions : list
+        Positions of the installations.
+    new : pandas dataframe
+        New content of the installations, with the columns of the csv.
+    """
+    for position, row in zip(positions, make_list(new)):
+        table.children[len(header) + position] = row
+
+def remove_rows(positions):
+    """ Removes the rows of installations, the next ones moving up.
+
+    Parameters
+    ----------
+    positions : list
+        Positions of the installations.
+    """
+    for position in sorted(positions, reverse=True):
+        del table.children[len(header) + position]
 
 # Lists page layout
 layout = html.Div([
@@ -54,16 +86,19 @@ layout = html.Div([
         dcc.Link('GLOSSARY', href='/glossary', className='banner_link'),
         html.P(style={'paddingBottom': '0.5cm'}), 
         dcc.Link('LIST OF INSTALLATIONS', href='/lists', className='banner_link_fixed'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('INTERSECTIONS', href='/intersections', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('MAP', href='/map', className='banner_link'),
+        html.P(style={'paddingBottom': '0.5cm'}), 
+        dcc.Link('TRENDS', href='/trends', className='banner_link'),
     ]), 
 
     html.Div(className="page_lists",
     children =[
     html.P(style={'paddingBottom': '0.5cm'}),
 
-    html.Table(
-            [html.Th(col) for col in ['Name', 'Creator(s)', 'Year', 'Source']]
-            + rows
-    ),
+    table,
 
     html.P(style={'paddingBottom': '2cm'}),
 
@@ -0,0 +1,96 @@
+import threading
+import functools
+from contextlib import contextmanager
+
+""" Lock of the live data shared by the threads of the server: requests read the
+snapshot, the caches and the list of installations while holding it in shared mode,
+and updates of the dataset change them in place while holding it exclusively.
+It is held around the access to the data only, not while responses are streamed."""
+
+
+class SharedLock:
+    """ Readers-writer lock: any number of readers at once, or a single writer.
+    Waiting writers go first, so that a steady flow of readers doesn't starve them.
+    A thread holding the lock in shared mode can't take it exclusively: it must
+    release it first, as the data it read may change meanwhile.
+
+    Attributes
+    ----------
+    self.readers : int
+        Number of shared holds.
+    self.writer : bool
+        Whether the lock is held exclusively.
+    self.waiting : int
+        Number of writers waiting.
+    """
+    def __init__(self):
+        """ Initializes a free lock."""
+        self.readers = 0
+        self.writer = False
+        self.waiting = 0
+        self.condition = threading.Condition()
+        self.local = threading.local()
+
+    def held(self):
+        """ Returns the number of shared holds of the current thread."""
+        return getattr(self.local, 'reads', 0)
+
+    def acquire_read(self):
+        """ Takes the lock in shared mode, waiting for the writers."""
+        with self.condition:
+            if self.held() == 0:
+                while self.writer or self.waiting:
+                    self.condition.wait()
+            self.readers += 1
+            self.local.reads = self.held() + 1
+
+    def release_read(self):
+        """ Gives up a shared hold."""
+        with self.condition:
+            self.readers -= 1
+            self.local.reads = self.held() - 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    @contextmanager
+    def reading(self):
+        """ Holds the lock in shared mode."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        """ Holds the lock exclusively. Raises a RuntimeError if the current thread
+        holds it in shared mode, which would deadlock."""
+        if self.held():
+            raise RuntimeError('The lock is held in shared mode by the current thread')
+        with self.condition:
+            self.waiting += 1
+            try:
+                while self.writer or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+    def reader(self, func):
+        """ Decorates a function so that it runs holding the lock in shared mode.
+
+        Parameters
+        ----------
+        func : function
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.reading():
+                return func(*args, **kwargs)
+        return wrapper
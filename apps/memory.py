@@ -0,0 +1,99 @@
+import sys, tracemalloc
+import numpy as np
+import pandas as pd
+
+""" Memory accounting of the data structures of the application. Structures are
+registered by name with a function returning them, so that the report follows
+the live objects (e.g. arrays reallocated when installations are appended)."""
+
+registry = {}
+
+
+def register(name, getter, entries=None):
+    """ Registers a structure in the memory report.
+
+    Parameters
+    ----------
+    name : str
+        Name of the structure in the report.
+    getter : function
+        Returns the structure.
+    entries : function, optional
+        Returns the number of entries of the structure, for caches.
+    """
+    registry[name] = (getter, entries)
+
+def deep_size(obj, seen=None):
+    """ Returns the size in bytes of an object and of everything it references,
+    each object being counted once. Arrays and dataframes are measured by their buffers.
+
+    Parameters
+    ----------
+    obj : object
+        Measured object.
+    seen : set
+        IDs of the objects already counted.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return size + deep_size(vars(obj), seen)
+    return size
+
+def top_allocators(n=20):
+    """ Returns the n source lines having allocated the most memory still in use
+    since tracemalloc was started, or an empty list if it isn't tracing.
+
+    Parameters
+    ----------
+    n : int
+        Number of source lines.
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    statistics = tracemalloc.take_snapshot().statistics('lineno')
+    return [{'location': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count} for stat in statistics[:n]]
+
+def report(n=20):
+    """ Returns the deep size of every registered structure, the entry counts
+    of the caches and the top allocators. Objects shared by several structures
+    are counted once, in the first one registered.
+
+    Parameters
+    ----------
+    n : int
+        Number of top allocators.
+    """
+    structures = {}
+    seen = set()
+    alive = []  # keeps the structures returned by the getters until the end, so that their IDs aren't reused
+    for name, (getter, entries) in registry.items():
+        alive.append(getter())
+        structures[name] = {'bytes': deep_size(alive[-1], seen)}
+        if entries is not None:
+            structures[name]['entries'] = entries()
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return {
+        'structures': structures,
+        'total_bytes': sum(s['bytes'] for s in structures.values()),
+        'traced_bytes': traced[0],
+        'traced_peak_bytes': traced[1],
+        'top_allocators': top_allocators(n),
+    }
@@ -0,0 +1,53 @@
+import threading
+
+""" In-process metrics of the application, reported as json by the /metrics endpoint.
+Counters count events, summaries keep the count, total and maximum of observed values,
+both being labelled (e.g. by callback output)."""
+
+lock = threading.Lock()
+counters = {}
+summaries = {}
+
+
+def increment(name, label='', value=1):
+    """ Increments a counter.
+
+    Parameters
+    ----------
+    name : str
+        Name of the counter.
+    label : str
+        Label of the counted events.
+    value : int
+        Increment.
+    """
+    with lock:
+        counter = counters.setdefault(name, {})
+        counter[label] = counter.get(label, 0) + value
+
+def observe(name, label, value):
+    """ Records an observed value in a summary.
+
+    Parameters
+    ----------
+    name : str
+        Name of the summary.
+    label : str
+        Label of the observed value.
+    value : float
+        Observed value.
+    """
+    with lock:
+        summary = summaries.setdefault(name, {}).setdefault(label, {'count': 0, 'total': 0, 'max': 0})
+        summary['count'] += 1
+        summary['total'] += value
+        summary['max'] = max(summary['max'], value)
+
+def report():
+    """ Returns every counter and summary, summaries including the mean value."""
+    with lock:
+        return {
+            'counters': {name: dict(counter) for name, counter in counters.items()},
+            'summaries': {name: {label: dict(s, mean=s['total'] / s['count']) for label, s in summary.items()}
+                for name, summary in summaries.items()},
+        }
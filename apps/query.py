@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from apps.schema import DATA_PATH, load_data
+from apps.sunburst import appObj
+from apps.snapshot import Snapshot
+from apps.facets import tag_counts
+
+"""
+Queries on the dataset without Dash or Plotly, for batch jobs: the taxonomy, the
+installations belonging to categories (as listed by the application) and the node
+values of the filtered sunbursts, returned as numpy arrays and pandas dataframes.
+The application runs its own queries through this module.
+
+Example:
+    from apps.query import Database
+    db = Database()
+    db.installations(['Outdoor'], years=(2000, 2010))
+    db.sunburst('AI', ['Outdoor'])
+"""
+
+""" Dimensions of the sunbursts: name, and position of their first category
+listed in the dropdown menu (the ones before are the themes and groups)."""
+DIMENSIONS = {'AI': ('Artistic Intention', 12), 'IN': ('Interaction', 7), 'SD': ('System Design', 18)}
+
+
+class Database:
+    """ Compiled dataset, queried by categories.
+
+    Attributes
+    ----------
+    self.data : pandas dataframe
+        Data from csv file.
+    self.objs : dict
+        Sunburst object (appObj) of each dimension, initiated.
+    self.labels : list
+        Label of each category of the dropdown menu.
+    self.ids : list
+        Tag column of each category of the dropdown menu.
+    self.parents : list
+        Label of the parent of each category of the dropdown menu.
+    self.sectionof : dict
+        Tag column of each category label.
+    self.snapshot : Snapshot
+        Tag matrix and indexes of the installations.
+    """
+    def __init__(self, path=DATA_PATH, data=None):
+        """ Loads and compiles the dataset.
+
+        Parameters
+        ----------
+        path : str
+            Path of the csv file.
+        data : pandas dataframe, optional
+            Data already loaded from the csv file.
+        """
+        self.data = load_data(path) if data is None else data
+        self.objs = {}
+        self.labels, self.ids, self.parents = [], [], []
+        for key, (name, start) in DIMENSIONS.items():
+            obj = appObj(self.data, name)
+            obj.initiate_arrays()
+            self.objs[key] = obj
+            self.labels += obj.labels[start:]
+            self.ids += obj.df['ids'][start:].tolist()
+            self.parents += obj.parentslabels[start:]
+        self.sectionof = {}
+        for label, ID in zip(self.labels, self.ids):
+            self.sectionof.setdefault(label, ID)
+        self.snapshot = Snapshot(self.data, list(self.objs.values()))
+
+    def sections(self, values):
+        """ Converts categories, as labelled in the dropdown menu and the sunburst,
+        into the corresponding tag columns. Tag columns and fields are returned unchanged.
+
+        Parameters
+        ----------
+        values : list
+            Category or categories.
+        """
+        return [self.sectionof.get(value, value) for value in values]
+
+    def select(self, values, rows=slice(None), years=None):
+        """ Returns a boolean mask of the installations belonging to every input category.
+
+        Parameters
+        ----------
+        values : list
+            Category or categories.
+        rows : slice
+            Contiguous range of installations to consider, all of them by default.
+        years : tuple, optional
+            First and last year of the installations to consider.
+        """
+        return self.snapshot.select(self.sections(values), rows, years)
+
+    def rows(self, values=(), years=None):
+        """ Returns the positions of the installations belonging to every input category.
+
+        Parameters
+        ----------
+        values : list
+            Category or categories, all installations if empty.
+        years : tuple, optional
+            First and last year of the installations.
+        """
+        return np.flatnonzero(self.select(sorted(set(self.sections(values))), years=years))
+
+    def installations(self, values=(), years=None):
+        """ Returns the installations belonging to every input category,
+        with the columns of the csv, as listed by the application.
+
+        Parameters
+        ----------
+        values : list
+            Category or categories, all installations if empty.
+        years : tuple, optional
+            First and last year of the installations.
+        """
+        return self.snapshot.take(self.rows(values, years))
+
+    def tag_counts(self, values=(), years=None):
+        """ Counts the installations of each tag among the ones belonging to every input category.
+
+        Parameters
+        ----------
+        values : list
+            Category or categories, all installations if empty.
+        years : tuple, optional
+            First and last year of the installations.
+        """
+        return pd.Series(tag_counts(self.select(values, years=years), self.snapshot.tags), index=self.snapshot.tagcols)
+
+    def sunburst(self, dimension, values=(), years=None, counts=None):
+        """ Returns the sunburst dataframe of a dimension (ids, values, labels and parents)
+        with node values computed for the installations belonging to every input category.
+        Nodes without any installation are left out.
+
+        Parameters
+        ----------
+        dimension : str
+            AI, IN or SD.
+        values : list
+            Category or categories, all installations if empty.
+        years : tuple, optional
+            First and last year of the installations.
+        counts : pandas series, optional
+            Tag counts of the installations, when already computed by tag_counts.
+        """
+        obj = self.objs[dimension]
+        frame = obj.df.copy()
+        frame['values'] = obj.node_values(self.tag_counts(values, years) if counts is None else counts)
+        return frame[frame['values'] > 0]
+
+    def taxonomy(self, dimension=None):
+        """ Returns the nodes of the taxonomy (ids, labels and parents) of a dimension,
+        or the categories of the dropdown menu of all dimensions.
+
+        Parameters
+        ----------
+        dimension : str, optional
+            AI, IN or SD.
+        """
+        if dimension is None:
+            return pd.concat([self.objs[key].df[['ids', 'labels', 'parents']].iloc[start:]
+                for key, (name, start) in DIMENSIONS.items()], ignore_index=True)
+        return self.objs[dimension].df[['ids', 'labels', 'parents']].reset_index(drop=True)
@@ -0,0 +1,139 @@
+import json, hashlib, threading
+from collections import OrderedDict
+
+from apps import metrics
+
+""" Fields of a Dash update request that determine its response."""
+REQUEST_FIELDS = ['output', 'outputs', 'inputs', 'state', 'changedPropIds']
+
+
+def request_key(body, version):
+    """ Hashes a callback request, normalized so that equivalent requests
+    give the same key, together with the version of the dataset.
+
+    Parameters
+    ----------
+    body : dict
+        Json body of the /_dash-update-component request.
+    version : str
+        Version of the dataset.
+    """
+    normalized = {field: body.get(field) for field in REQUEST_FIELDS}
+    normalized['changedPropIds'] = sorted(normalized['changedPropIds'] or [])
+    text = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1((version + text).encode()).hexdigest()
+
+
+class ResponseCache:
+    """ Bounded store of callback response bodies, least recently used first out,
+    with the side effects of the callbacks that computed them. The total size of the bodies kept in memory is bounded; a disk cache can
+    back the memory one, keeping the bodies evicted from memory.
+
+    Attributes
+    ----------
+    self.max_bytes : int
+        Maximum total size of the bodies kept in memory.
+    self.disk : diskcache.Cache
+        Disk store, None if the cache is in memory only.
+    self.entries : OrderedDict
+        (body, mimetype, side effects) by request key, least recently used first.
+    self.size : int
+        Total size of the bodies kept in memory.
+    self.hits : int
+        Number of requests answered from the cache.
+    self.misses : int
+        Number of requests computed.
+    self.evictions : int
+        Number of bodies evicted from memory.
+    self.lock : threading.Lock
+        Guards the entries and counters, shared by the server threads.
+    """
+    def __init__(self, max_bytes, disk=None):
+        """ Initializes an empty cache.
+
+        Parameters
+        ----------
+        max_bytes : int
+            Maximum total size of the bodies kept in memory.
+        disk : diskcache.Cache, optional
+            Disk store backing the memory one.
+        """
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """ Returns the (body, mimetype, side effects) of a request, None if not cached.
+
+        Parameters
+        ----------
+        key : str
+            Request key, as returned by request_key.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                entry = tuple(entry) + ((),) * (3 - len(entry))  # stored without side effects
+                self.put(key, *entry, persist=False)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.increment('response_cache', 'miss' if entry is None else 'hit')
+        return entry
+
+    def put(self, key, body, mimetype, effects=(), persist=True):
+        """ Stores the body of a response, evicting the least recently used ones
+        when the memory bound is exceeded.
+
+        Parameters
+        ----------
+        key : str
+            Request key, as returned by request_key.
+        body : bytes
+            Body of the response.
+        mimetype : str
+            Mimetype of the response.
+        effects : tuple
+            (name, arguments) of the side effects of the callback, replayed on hits.
+        persist : bool
+            Whether the body is also written to the disk store.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key)[0])
+            self.entries[key] = (body, mimetype, effects)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                evicted = self.entries.popitem(last=False)[1][0]
+                self.size -= len(evicted)
+                self.evictions += 1
+        if persist and self.disk is not None:
+            self.disk.set(key, (body, mimetype, effects))
+
+    def stats(self):
+        """ Returns the number of entries, their size and the hit rate of the cache."""
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'disk_entries': len(self.disk) if self.disk is not None else 0,
+            }
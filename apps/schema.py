@@ -0,0 +1,265 @@
+import os, re, functools, hashlib, logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+""" Path of the csv located in repo."""
+DATA_PATH = os.path.join(os.getcwd(), 'data', 'installationsList.csv')
+
+""" Descriptive columns of the csv."""
+META_COLUMNS = ['ID', 'Name', 'Creator(s)', 'Hyperlink', 'References', 'Publication', 'Year',
+    'Subject Area', 'Field', 'Type', 'Source']
+
+""" Descriptive columns whose values are repeated across installations."""
+CATEGORICAL_COLUMNS = ['Publication', 'Type', 'Source']
+
+""" Binary columns of the csv: taxonomy tags, empty cells standing for 0."""
+BINARY_COLUMNS = ['CO_Exhibition', 'CO_Outdoor', 'CO_Indoor', 'CO_School', 'CO_Prototype', 'CO_Trans',
+    'CO_Care', 'AU_Adults', 'AU_Child', 'AU_Both', 'IV_None', 'IV_NonSonic', 'IV_Visual_Int', 'IV_SonicEl',
+    'LS_Dyn_Path', 'LS_Dyn_NoSpec', 'LS_SweetSpot', 'LP_Ephemeral', 'LP_Temp', 'LP_Semi', 'SD_Mat_Abs',
+    'SD_Mat_Ref', 'SD_Mat_Local', 'SD_Mat_Infra', 'SD_Mat_Pre', 'SD_Pro_Son', 'SD_Pro_Feed', 'SD_Pro_Gen',
+    'SD_Pro_Cancel', 'SD_SiteAcou', 'LI_None', 'LI_Spot', 'LI_Dynamic', 'RS_Expr', 'RS_Info', 'RS_Didactic',
+    'RS_Therapeutic', 'IA_Many', 'IA_FewA', 'IA_OneA', 'IA_Countles', 'IA_None', 'IDof_One', 'IDof_Several',
+    'IDof_Many', 'ODof_One', 'ODof_Several', 'ODof_Many', 'FT_Visu', 'FT_Haptic', 'FT_Sonic', 'FT_Heat',
+    'FT_Taste', 'FT_Smell', 'MC_Process', 'MC_Note', 'MC_Timbral', 'IT_Use_Activity', 'IT_Use_Network',
+    'IT_Use_Embodied', 'IT_Use_Motion', 'IT_Use_VisiSounds', 'IT_Use_EyeTrack', 'IT_Use_Facial',
+    'IT_Use_Brain', 'IT_Ada_Natural', 'TS_Server', 'TS_Ele_Cartrige', 'TS_Ele_Volt', 'TS_Ele_Capa',
+    'TS_Mec_Acce', 'TS_Mec_PressSens', 'TS_Mec_Bend', 'TS_Mec_Torque', 'TS_Mec_Potent', 'TS_Ide_RFID',
+    'TS_Ide_BarCode', 'TS_Ide_Coin', 'TS_Mic_Piezo', 'TS_Mic_Micr', 'TS_Ima_Came', 'TS_Ima_Motion',
+    'TS_Bio_Finger', 'TS_Bio_EMGs', 'TS_Bio_EEG', 'TS_Con_Remote', 'TS_Con_Novint', 'TS_Con_Game',
+    'TS_Con_Touch', 'TS_Con_Mouse', 'TS_Det_PressurePad', 'TS_Det_Proximity', 'TS_Env_Light', 'TS_Env_Heat',
+    'TS_Env_Wind', 'TS_Env_Sism', 'SP_Num_One', 'SP_Num_Two', 'SP_Num_Mult', 'SP_Hea_Stereo', 'SP_Pnt_Same',
+    'SP_Pnt_Diff', 'SP_Pnt_Dyna', 'SP_Cnt_Channel', 'SP_Cnt_Algo', 'SP_Dir_Directive', 'SP_Dir_Omni',
+    'SG_Speakers', 'SG_Obj_Elec', 'SG_Obj_Mecha', 'SG_Obj_Reso', 'SG_Musical', 'UE_InfObs', 'UE_Study',
+    'Cross_Reference']
+
+""" Subject areas accepted in the Subject Area column, by global subject area,
+as placed in the Field sunburst."""
+SUBJECT_AREAS = {
+    'Computer Science': 'Physical Sciences', 'Engineering': 'Physical Sciences',
+    'Mathematics': 'Physical Sciences', 'Physics and Astronomy': 'Physical Sciences',
+    'Materials Science': 'Physical Sciences', 'Environmental Science': 'Physical Sciences',
+    'Medicine': 'Health Sciences', 'Nursing': 'Health Sciences', 'Health Professions': 'Health Sciences',
+    'Arts and Humanities': 'Social Sciences', 'Decision Sciences': 'Social Sciences',
+    'Psychology': 'Social Sciences', 'Social Sciences Area': 'Social Sciences',
+    'Neuroscience': 'Life Sciences',
+}
+
+""" Accepted years: a single year, or a range possibly left open (e.g. 2004-2006, 2012-)."""
+YEAR_PATTERN = re.compile(r'^\d{4}(-(\d{4})?)?$')
+
+
+def binary_values(data):
+    """ Returns the binary columns as a single float array, NaN standing for empty
+    or non-numeric cells. Numeric columns are converted at once, without parsing
+    each column separately.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Data from csv file.
+    """
+    try:
+        return data[BINARY_COLUMNS].to_numpy(dtype=np.float64)
+    except (ValueError, TypeError):
+        return np.column_stack([pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=np.float64)
+            for col in BINARY_COLUMNS])
+
+def subject_error(area, field):
+    """ Returns why the subject areas and fields of an installation can't be placed in
+    the Field sunburst, None if they can. Several fields are separated by semicolons,
+    each one belonging to the subject area at the same place in the Subject Area column.
+
+    Parameters
+    ----------
+    area : str
+        Subject Area column of the installation.
+    field : str
+        Field column of the installation.
+    """
+    if field is None or str(field) == 'nan':
+        return None
+    areas, fields = str(area).split('; '), str(field).split('; ')
+    if len(areas) < len(fields):
+        return 'Subject Area must give the area of each field, got ' + repr(area) + ' for ' + repr(field)
+    for a, f in zip(areas, fields):
+        if a not in SUBJECT_AREAS:
+            return 'Subject Area must be one of ' + ', '.join(SUBJECT_AREAS) + ', got ' + repr(a)
+        if not f.strip() or f in SUBJECT_AREAS or f in SUBJECT_AREAS.values():
+            return 'Field must name a field, not a subject area, got ' + repr(f)
+    return None
+
+def row_errors(data):
+    """ Returns the (index, message) of every row violating the schema of the csv,
+    binary columns first, then years, subject areas and fields, then IDs.
+    The columns must be present.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Data from csv file.
+    """
+    errors = []
+    values = binary_values(data)
+    wrong = ~((values == 0) | (values == 1) | data[BINARY_COLUMNS].isna().to_numpy())
+    for j in np.flatnonzero(wrong.any(axis=0)):
+        col = BINARY_COLUMNS[j]
+        for i in data.index[wrong[:, j]]:
+            errors.append((i, col + ' must be 0 or 1, got ' + repr(data.loc[i, col])
+                + ' for installation ' + str(data.loc[i, 'ID'])))
+
+    years = data['Year'].astype(str).str.strip()
+    for i in data.index[~years.str.match(YEAR_PATTERN)]:
+        errors.append((i, 'Year must be numeric, got ' + repr(data.loc[i, 'Year'])
+            + ' for installation ' + str(data.loc[i, 'ID'])))
+
+    for i, area, field in zip(data.index, data['Subject Area'], data['Field']):
+        message = subject_error(area, field)
+        if message is not None:
+            errors.append((i, message + ' for installation ' + str(data.loc[i, 'ID'])))
+
+    ids = pd.to_numeric(data['ID'], errors='coerce')
+    for i in data.index[ids.isna() | (ids % 1 != 0)]:
+        errors.append((i, 'ID must be an integer, got ' + repr(data.loc[i, 'ID'])))
+    for i in data.index[ids.duplicated() & ids.notna()]:
+        errors.append((i, 'ID must be unique, got ' + str(data.loc[i, 'ID']) + ' more than once'))
+    return errors
+
+def validate(data):
+    """ Checks that a dataframe follows the schema of the csv.
+    Raises a ValueError describing the first violation found.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Data from csv file.
+    """
+    missing = [col for col in META_COLUMNS + BINARY_COLUMNS if col not in data.columns]
+    if missing:
+        raise ValueError('Missing columns: ' + ', '.join(missing))
+
+    errors = row_errors(data)
+    if errors:
+        raise ValueError(errors[0][1])
+
+def compact(data):
+    """ Converts a validated dataframe to compact types: tags as uint8, held
+    in a single block, and repeated strings as categoricals.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Data from csv file.
+    """
+    tags = pd.DataFrame(np.nan_to_num(binary_values(data)).astype(np.uint8), index=data.index, columns=BINARY_COLUMNS)
+    data = pd.concat([data.drop(columns=BINARY_COLUMNS), tags], axis=1)[list(data.columns)]
+    for col in CATEGORICAL_COLUMNS:
+        data[col] = data[col].astype('category')
+    data['ID'] = data['ID'].astype('int32')
+    data['Year'] = data['Year'].astype(str).str.strip()
+    return data
+
+def doi_to_url(link):
+    """ Converts the doi into a proper url.
+    If the input is a link, returns it unchanged.
+
+    Parameters
+    ----------
+    link : str
+        Doi number.
+    """
+    if re.match('10.', link):
+        return 'https://doi.org/' + link
+    elif re.match('DOI:', link):
+        return re.sub('DOI:', 'https://doi.org/', link)
+    elif re.match('doi:', link):
+        return re.sub('doi:', 'https://doi.org/', link)
+    else:
+        return link
+
+def normalize_link(link):
+    """ Returns the hyperlink of an installation in canonical form: trimmed,
+    DOIs as https://doi.org/ urls and other links with a scheme.
+    Returns an empty string for a missing link.
+
+    Parameters
+    ----------
+    link : str
+        Doi number or url.
+    """
+    if pd.isna(link):
+        return ''
+    link = doi_to_url(re.sub(r'\s+', '', str(link)))
+    link = re.sub(r'^https?://(dx\.)?doi\.org/', 'https://doi.org/', link, flags=re.IGNORECASE)
+    if link and not re.match(r'^[a-z]+://', link, flags=re.IGNORECASE):
+        link = 'https://' + link
+    return link
+
+def row_hashes(data):
+    """ Returns a 64-bit hash of the content of each installation, addressing rows
+    by content: identical rows have the same hash whatever their position and
+    whether their columns are compacted.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        Installations, with the columns of the csv.
+    """
+    hashes = pd.util.hash_pandas_object(data[META_COLUMNS], index=False).to_numpy()
+    # Tags hashed as packed 64-bit words rather than column by column
+    packed = np.packbits(data[BINARY_COLUMNS].to_numpy(dtype=np.uint8), axis=1)
+    words = np.zeros((len(packed), -(-packed.shape[1] // 8) * 8), dtype=np.uint8)
+    words[:, :packed.shape[1]] = packed
+    for word in words.view(np.uint64).T:
+        hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(word)
+    return hashes
+
+def content_version(hashes):
+    """ Returns a short hash of a set of row hashes, identifying the version of the
+    dataset in cache keys. It only depends on the content of the installations, not
+    on their order nor on how the dataset got there, so that processes holding the
+    same installations agree on the version.
+
+    Parameters
+    ----------
+    hashes : numpy array
+        Row hashes of the installations, as returned by row_hashes.
+    """
+    return hashlib.sha1(np.sort(hashes).tobytes()).hexdigest()[:12]
+
+def data_version(path=DATA_PATH):
+    """ Returns the version of the dataset of a csv file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    """
+    return content_version(row_hashes(load_data(path)))
+
+def memory(data):
+    """ Returns the memory used by a dataframe, in bytes.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+    """
+    return int(data.memory_usage(deep=True).sum())
+
+@functools.lru_cache(maxsize=None)
+def load_data(path=DATA_PATH):
+    """ Loads, validates and compacts the csv. The dataframe is loaded once
+    and shared by every module importing it.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    """
+    raw = pd.read_csv(path)
+    validate(raw)
+    data = compact(raw)
+    logger.info('Loaded %d installations from %s: %d bytes in memory, %d bytes before compaction',
+        len(data), path, memory(data), memory(raw))
+    return data
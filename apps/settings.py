@@ -0,0 +1,70 @@
+import os
+
+""" Settings of the application, read from environment variables
+so that they can be changed per deployment without editing the code."""
+
+""" Directory of the local caches (background callback jobs and results)."""
+CACHE_DIR = os.environ.get('ISI_CACHE_DIR', os.path.join(os.getcwd(), 'cache'))
+
+""" Lifetime of the background callback results, in seconds."""
+BACKGROUND_EXPIRE = int(os.environ.get('ISI_BACKGROUND_EXPIRE', 24 * 3600))
+
+""" Method of the 2D projection of the installations shown on the map, 'pca' or 'mds'."""
+EMBEDDING_METHOD = os.environ.get('ISI_EMBEDDING_METHOD', 'pca')
+
+""" Lifetime of the server-rendered results pages in shared caches, in seconds.
+Their urls are scoped by the dataset version, so they never become outdated."""
+RESULTS_MAX_AGE = int(os.environ.get('ISI_RESULTS_MAX_AGE', 365 * 24 * 3600))
+
+""" Memoization of the callback responses (opt-in): whether it is enabled,
+the maximum total size of the responses kept in memory, and whether they
+are also kept in a disk cache under CACHE_DIR."""
+RESPONSE_CACHE = os.environ.get('ISI_RESPONSE_CACHE', '0') == '1'
+RESPONSE_CACHE_BYTES = int(os.environ.get('ISI_RESPONSE_CACHE_BYTES', 64 * 2**20))
+RESPONSE_CACHE_DISK = os.environ.get('ISI_RESPONSE_CACHE_DISK', '0') == '1'
+
+""" Log of the selections made by the users, replayed by the warm-up ('' to disable),
+number of the most frequent selections replayed, number of distinct selections
+counted at most, and interval in seconds between writes of the log."""
+ACCESS_LOG = os.environ.get('ISI_ACCESS_LOG', os.path.join(CACHE_DIR, 'access.log'))
+WARMUP_SELECTIONS = int(os.environ.get('ISI_WARMUP_SELECTIONS', 20))
+ACCESS_LOG_SIZE = int(os.environ.get('ISI_ACCESS_LOG_SIZE', 1000))
+ACCESS_LOG_INTERVAL = float(os.environ.get('ISI_ACCESS_LOG_INTERVAL', 60))
+
+""" Memory diagnostics: /debug/memory endpoint and tracing of the allocations
+with tracemalloc from startup, which slows the application down."""
+MEMORY_DIAGNOSTICS = os.environ.get('ISI_MEMORY_DIAGNOSTICS', '0') == '1'
+
+""" Level of the messages of the application written to stderr: DEBUG, INFO
+(memory used by the dataset when loaded, reloads of the csv), WARNING or ERROR."""
+LOG_LEVEL = os.environ.get('ISI_LOG_LEVEL', 'INFO').upper()
+
+""" Minimum score (0 to 1) of the likely duplicates flagged before installations are added."""
+DUPLICATE_THRESHOLD = float(os.environ.get('ISI_DUPLICATE_THRESHOLD', 0.6))
+
+""" Interval in seconds between the checks of the csv for edits, applied incrementally
+to the live snapshot, 0 to disable."""
+DATA_RELOAD_INTERVAL = float(os.environ.get('ISI_DATA_RELOAD_INTERVAL', 5))
+
+""" Static images of the sunbursts: directory of the rendered images, and number
+of processes rendering them (0 for the number of cpus)."""
+IMAGE_DIR = os.environ.get('ISI_IMAGE_DIR', os.path.join(CACHE_DIR, 'images'))
+IMAGE_WORKERS = int(os.environ.get('ISI_IMAGE_WORKERS', 0))
+
+""" Admission control (opt-in): number of requests of each route handled at once,
+rate limit of each client per route (requests per second/burst), and number of requests
+waiting per route and for how long at most, before being rejected with a 503.
+Routes are path prefixes, or callback requests by output (#output.children being the
+form of apps.submit). Clients are told apart by address, or by the last address of
+CLIENT_HEADER (e.g. X-Forwarded-For) behind a reverse proxy."""
+ADMISSION = os.environ.get('ISI_ADMISSION', '0') == '1'
+ADMISSION_LIMITS = os.environ.get('ISI_ADMISSION_LIMITS', '/_dash-update-component=8,/export=2,/images=2,/results=4')
+RATE_LIMITS = os.environ.get('ISI_RATE_LIMITS',
+    '/_dash-update-component=10/40,/_dash-update-component#output.children=0.2/3,/api/installations=1/10')
+ADMISSION_QUEUE = int(os.environ.get('ISI_ADMISSION_QUEUE', 16))
+ADMISSION_TIMEOUT = float(os.environ.get('ISI_ADMISSION_TIMEOUT', 5))
+CLIENT_HEADER = os.environ.get('ISI_CLIENT_HEADER', '')
+
+""" Token of the write API (POST /api/installations), sent as a bearer token,
+the write API being disabled when empty."""
+API_TOKEN = os.environ.get('ISI_API_TOKEN', '')
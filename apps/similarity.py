@@ -0,0 +1,83 @@
+import numpy as np
+
+""" Number of bits set in each byte, used when numpy has no bitwise_count."""
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_words(tags):
+    """ Packs the binary tag vectors of the installations into 64-bit words.
+
+    Parameters
+    ----------
+    tags : numpy array
+        Binary array of shape (number of installations, number of tags).
+
+    Returns
+    -------
+    numpy array
+        Array of shape (number of installations, number of words), dtype uint64.
+    """
+    packed = np.packbits(tags.astype(bool), axis=1)
+    width = -(-packed.shape[1] // 8) * 8
+    padded = np.zeros((len(packed), width), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+def popcount(words):
+    """ Counts the bits set in each row of an array of 64-bit words.
+
+    Parameters
+    ----------
+    words : numpy array
+        Array of shape (number of rows, number of words), dtype uint64.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+def similarities(words, norms, i, metric='jaccard'):
+    """ Computes the similarity between one installation and all the others
+    from their packed tag vectors.
+
+    Parameters
+    ----------
+    words : numpy array
+        Packed tag vectors, as returned by pack_words.
+    norms : numpy array
+        Number of tags of each installation.
+    i : int
+        Position of the installation.
+    metric : str
+        'jaccard' (shared tags over tags of either) or 'cosine'.
+    """
+    inter = popcount(words & words[i]).astype(np.float64)
+    if metric == 'jaccard':
+        union = norms + norms[i] - inter
+    elif metric == 'cosine':
+        union = np.sqrt(norms * norms[i].astype(np.float64))
+    else:
+        raise ValueError('Unknown similarity metric: ' + str(metric))
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+def top_k(scores, k, exclude=None):
+    """ Returns the positions and scores of the k highest scores, best first.
+    The selection is made with argpartition, only the k best being sorted.
+
+    Parameters
+    ----------
+    scores : numpy array
+        Score of each installation.
+    k : int
+        Number of positions returned.
+    exclude : int, optional
+        Position left out, e.g. the installation compared to the others.
+    """
+    scores = scores.astype(np.float64, copy=True)
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    k = min(k, len(scores) - (exclude is not None))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return best, scores[best]
@@ -0,0 +1,595 @@
+import re, bisect
+from collections import deque
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from apps.schema import row_hashes, content_version
+from apps.indexes import tag_nodes, reverse_index
+from apps.similarity import pack_words, popcount, similarities, top_k
+from apps.embedding import Embedding
+from apps.trends import start_years, YearIndex, TrendCube
+from apps.facets import FacetIndex
+from apps.duplicates import DuplicateIndex
+
+""" Number of entries kept in the changelog of a snapshot."""
+CHANGELOG_SIZE = 1000
+
+
+def grow(array, size):
+    """ Returns an array holding at least size rows, doubling its capacity
+    when needed so that appending rows is amortized.
+
+    Parameters
+    ----------
+    array : numpy array
+        Array whose first rows are in use.
+    size : int
+        Number of rows needed.
+    """
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(2 * len(array), size),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+def fields(value):
+    """ Returns the fields of an installation, as labelled in the sunburst.
+
+    Parameters
+    ----------
+    value : str
+        Field column of the installation, fields being separated by semicolons.
+    """
+    return [re.sub(' ', '<br>', field) for field in str(value).split('; ')]
+
+
+class View:
+    """ Installations of a snapshot as of a given version. The snapshot never modifies
+    its segments in place, replacing them when installations change, so that a view
+    stays consistent while the snapshot is updated, e.g. during a streamed export.
+
+    Attributes
+    ----------
+    self.segments : list
+        Dataframes holding the installations.
+    self.offsets : list
+        Position of the first installation of each segment.
+    self.n : int
+        Number of installations.
+    """
+    def __init__(self, segments, offsets, n):
+        """ Initializes instance variables.
+
+        Parameters
+        ----------
+        segments : list
+            Dataframes holding the installations.
+        offsets : list
+            Position of the first installation of each segment.
+        n : int
+            Number of installations.
+        """
+        self.segments = list(segments)
+        self.offsets = list(offsets)
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def take(self, positions):
+        """ Returns the installations at the input positions, like DataFrame.take,
+        without concatenating the segments.
+
+        Parameters
+        ----------
+        positions : numpy array
+            Sorted positions of the installations.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(self.segments) == 1:
+            return self.segments[0].take(positions)
+        bounds = np.searchsorted(positions, self.offsets + [self.n])
+        parts = [segment.take(positions[bounds[s]:bounds[s + 1]] - self.offsets[s])
+            for s, segment in enumerate(self.segments)]
+        return pd.concat(parts)
+
+
+class Snapshot:
+    """ Live state of the dataset and of the structures derived from it.
+    New installations are appended in place, each derived structure being
+    updated in proportion to the number of new rows only.
+
+    Attributes
+    ----------
+    self.segments : list
+        Dataframes holding the installations, the first one being the csv
+        and the next ones the appended batches. They are replaced, never
+        modified in place, when installations change (see View).
+    self.offsets : list
+        Position of the first installation of each segment.
+    self.n : int
+        Number of installations.
+    self.objs : list
+        Sunburst objects (appObj) of the dimensions.
+    self.tagcols : list
+        Tag column of each column of the tag matrix.
+    self.tagindex : dict
+        Column of each tag in the tag matrix.
+    self.counts : numpy array
+        Number of installations carrying each tag.
+    self.words : numpy array
+        Tag vectors packed into 64-bit words, used for similarities.
+    self.norms : numpy array
+        Number of tags of each installation.
+    self.embedding : Embedding
+        2D projection of the tag vectors, None if not fitted.
+    self.coords : numpy array
+        Coordinates of each installation in the 2D projection.
+    self.years : YearIndex
+        Positions of the installations sorted by year.
+    self.cube : TrendCube
+        Number of installations carrying each tag, by year.
+    self.facets : FacetIndex
+        One-hot matrix of the tags, publication, type, source and decade.
+    self.duplicates : DuplicateIndex
+        DOIs and MinHash signatures of the names and creators, finding likely duplicates.
+    self.fieldrows : dict
+        Sorted positions of the installations associated with each field.
+    self.nodes : dict
+        (dimension, category, label) node of each tag column.
+    self.tagsof : dict
+        Reverse index from installation ID to the nodes of its tags.
+    self.ids : numpy array
+        ID of each installation, by position.
+    self.rowof : dict
+        Position of each installation, by ID.
+    self.hashes : numpy array
+        Hash of the content of each installation, by position.
+    self.version : str
+        Hash of the content of the snapshot, the same for identical installations
+        whatever the appends and updates that led to it.
+    self.changelog : deque
+        IDs of the installations added, changed and removed by each append or update, oldest first.
+    """
+    def __init__(self, data, objs):
+        """ Compiles the snapshot from the csv data.
+
+        Parameters
+        ----------
+        data : pandas dataframe
+            Data from csv file.
+        objs : list
+            Sunburst objects (appObj) already initiated.
+        """
+        self.segments = [data]
+        self.offsets = [0]
+        self.n = 0
+        self.objs = objs
+        self.tagcols = [col for obj in objs for col in obj.leaves]
+        self.tagindex = {col: i for i, col in enumerate(self.tagcols)}
+        self._tags = np.zeros((0, len(self.tagcols)), dtype=np.uint8)
+        self.counts = np.zeros(len(self.tagcols), dtype=np.int64)
+        self._words = pack_words(self._tags)
+        self._norms = np.zeros(0, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self.embedding = None
+        self._coords = np.zeros((0, 2))
+        self.years = YearIndex()
+        self.cube = TrendCube(len(self.tagcols))
+        self.facets = FacetIndex(self.tagcols)
+        self.duplicates = DuplicateIndex()
+        self.fieldrows = {}
+        self.nodes = tag_nodes(objs)
+        self.tagsof = {}
+        self.rowof = {}
+        self.changelog = deque(maxlen=CHANGELOG_SIZE)
+        self._data = data
+        self.index(data)
+        self.version = content_version(self.hashes)
+
+    @property
+    def tags(self):
+        """ Binary tag matrix of shape (number of installations, number of tags)."""
+        return self._tags[:self.n]
+
+    @property
+    def words(self):
+        return self._words[:self.n]
+
+    @property
+    def norms(self):
+        return self._norms[:self.n]
+
+    @property
+    def ids(self):
+        return self._ids[:self.n]
+
+    @property
+    def hashes(self):
+        return self._hashes[:self.n]
+
+    @property
+    def coords(self):
+        return self._coords[:self.n]
+
+    @property
+    def data(self):
+        """ All the installations as a single dataframe, concatenated on demand."""
+        if self._data is None:
+            self._data = pd.concat(self.segments, ignore_index=True)
+        return self._data
+
+    def __len__(self):
+        return self.n
+
+    def view(self):
+        """ Returns the installations of the current version, unaffected by later changes."""
+        return View(self.segments, self.offsets, self.n)
+
+    def take(self, positions):
+        """ Returns the installations at the input positions, like DataFrame.take,
+        without concatenating the segments.
+
+        Parameters
+        ----------
+        positions : numpy array
+            Sorted positions of the installations.
+        """
+        return self.view().take(positions)
+
+    def record(self, ID):
+        """ Returns an installation as a pandas series.
+
+        Parameters
+        ----------
+        ID : int
+            ID of the installation.
+        """
+        return self.take([self.rowof[ID]]).iloc[0]
+
+    def index(self, new):
+        """ Adds new installations to the tag matrix, the tag counts,
+        the field posting lists and the reverse index.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Installations, with the columns of the csv.
+        """
+        start = self.n
+        tags = new[self.tagcols].to_numpy(dtype=np.uint8)
+
+        words = pack_words(tags)
+        self._tags = grow(self._tags, start + len(new))
+        self._words = grow(self._words, start + len(new))
+        self._norms = grow(self._norms, start + len(new))
+        self._ids = grow(self._ids, start + len(new))
+        self._hashes = grow(self._hashes, start + len(new))
+        self._tags[start:start + len(new)] = tags
+        self._words[start:start + len(new)] = words
+        self._norms[start:start + len(new)] = popcount(words)
+        self._ids[start:start + len(new)] = new['ID'].to_numpy()
+        self._hashes[start:start + len(new)] = row_hashes(new)
+        if self.embedding is not None:
+            self._coords = grow(self._coords, start + len(new))
+            self._coords[start:start + len(new)] = self.embedding.transform(tags)
+        self.n += len(new)
+
+        self.counts += tags.sum(axis=0, dtype=np.int64)
+        years = start_years(new['Year'])
+        self.years.add(np.arange(start, self.n), years)
+        self.cube.add(years, tags)
+        self.facets.add(new)
+        self.duplicates.add(new)
+        for i, field in enumerate(new['Field'], start):
+            for f in fields(field):
+                self.fieldrows.setdefault(f, []).append(i)
+        self.tagsof.update(reverse_index(new['ID'].tolist(), tags, self.tagcols, self.nodes))
+        self.rowof.update((int(ID), i) for i, ID in enumerate(new['ID'], start))
+        self.refresh()
+
+    def refresh(self):
+        """ Recomputes the sunburst node values of the whole dataset from the tag counts."""
+        counts = pd.Series(self.counts, index=self.tagcols)
+        for obj in self.objs:
+            obj.df['values'] = obj.node_values(counts)
+
+    def append(self, new):
+        """ Appends new installations to the snapshot.
+        Returns the slice of their positions.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Validated and compacted installations, with the columns of the csv.
+        """
+        rows = self.extend(new)
+        self.commit(self.ids[rows].tolist(), [], [])
+        return rows
+
+    def extend(self, new):
+        """ Appends new installations to the snapshot, without recording them in
+        the changelog. Returns the slice of their positions.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Validated and compacted installations, with the columns of the csv.
+        """
+        duplicates = set(new['ID'].tolist()) & set(self.rowof)
+        if duplicates:
+            raise ValueError('Installations already in the database: ' + ', '.join(map(str, sorted(duplicates))))
+
+        start = self.n
+        new = new.reset_index(drop=True)
+        self.segments.append(new)
+        self.offsets.append(start)
+        self._data = None
+        self.index(new)
+        return slice(start, self.n)
+
+    def replace(self, new):
+        """ Replaces the content of installations already in the snapshot, at their
+        positions, updating each derived structure for these installations only.
+        Returns their sorted positions.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Validated and compacted installations, with the columns of the csv.
+        """
+        positions = np.array([self.rowof[int(ID)] for ID in new['ID']], dtype=np.int64)
+        order = np.argsort(positions)
+        positions, new = positions[order], new.iloc[order].reset_index(drop=True)
+        old = self.take(positions)
+        old_tags, tags = self._tags[positions], new[self.tagcols].to_numpy(dtype=np.uint8)
+        years = start_years(new['Year'])
+
+        words = pack_words(tags)
+        self._tags[positions] = tags
+        self._words[positions] = words
+        self._norms[positions] = popcount(words)
+        self._hashes[positions] = row_hashes(new)
+        if self.embedding is not None:
+            self._coords[positions] = self.embedding.transform(tags)
+
+        self.counts += tags.sum(axis=0, dtype=np.int64) - old_tags.sum(axis=0, dtype=np.int64)
+        self.years.remove(positions)
+        self.years.add(positions, years)
+        self.cube.remove(start_years(old['Year']), old_tags)
+        self.cube.add(years, tags)
+        self.facets.replace(positions, new)
+        self.duplicates.replace(positions, new)
+        for i, field in zip(positions, old['Field']):
+            for f in fields(field):
+                self.fieldrows[f].remove(i)
+                if not self.fieldrows[f]:
+                    del self.fieldrows[f]
+        for i, field in zip(positions, new['Field']):
+            for f in fields(field):
+                bisect.insort(self.fieldrows.setdefault(f, []), int(i))
+        self.tagsof.update(reverse_index(new['ID'].tolist(), tags, self.tagcols, self.nodes))
+
+        # Only the cells that differ are written in the segments
+        columns = old.columns
+        before, after = old.to_numpy(dtype=object), new[columns].to_numpy(dtype=object)
+        edited = columns[((before != after) & ~(pd.isna(before) & pd.isna(after))).any(axis=0)]
+        bounds = np.searchsorted(positions, self.offsets + [self.n])
+        for s in range(len(self.segments)):
+            if bounds[s] == bounds[s + 1]:
+                continue
+            segment = self.segments[s].copy()
+            local = positions[bounds[s]:bounds[s + 1]] - self.offsets[s]
+            for col in edited:
+                values = new[col].iloc[bounds[s]:bounds[s + 1]]
+                if isinstance(segment[col].dtype, pd.CategoricalDtype):
+                    missing = set(values.dropna()) - set(segment[col].cat.categories)
+                    segment[col] = segment[col].cat.add_categories(sorted(missing))
+                segment.loc[local, col] = values.to_numpy()
+            self.segments[s] = segment
+
+        self._data = None
+        self.refresh()
+        return positions
+
+    def remove(self, IDs):
+        """ Removes installations from the snapshot, the next ones moving up.
+        Returns the new position of each old position, -1 for removed installations.
+
+        Parameters
+        ----------
+        IDs : list
+            IDs of the installations.
+        """
+        positions = np.array(sorted(self.rowof[int(ID)] for ID in IDs), dtype=np.int64)
+        keep = np.ones(self.n, dtype=bool)
+        keep[positions] = False
+        moved = np.full(self.n, -1, dtype=np.int64)
+        moved[keep] = np.arange(keep.sum())
+
+        old_tags = self._tags[positions]
+        self.counts -= old_tags.sum(axis=0, dtype=np.int64)
+        self.cube.remove(start_years(self.take(positions)['Year']), old_tags)
+        self.years.remap(moved)
+        self.facets.remove(keep)
+        self.duplicates.remove(moved)
+        self.fieldrows = {field: rows for field, rows in
+            ((field, [int(moved[i]) for i in rows if moved[i] >= 0]) for field, rows in self.fieldrows.items()) if rows}
+        for ID in IDs:
+            del self.tagsof[int(ID)]
+
+        segments, offsets = [], []
+        for s, segment in enumerate(self.segments):
+            kept = keep[self.offsets[s]:self.offsets[s] + len(segment)]
+            if not kept.all():
+                segment = segment[kept].reset_index(drop=True)
+            if len(segment) > 0 or s == 0:
+                offsets.append(sum(len(part) for part in segments))
+                segments.append(segment)
+        self.segments, self.offsets = segments, offsets
+
+        self._tags = self.tags[keep]
+        self._words = self.words[keep]
+        self._norms = self.norms[keep]
+        self._ids = self.ids[keep]
+        self._hashes = self.hashes[keep]
+        if self.embedding is not None:
+            self._coords = self.coords[keep]
+        self.n = int(keep.sum())
+        self.rowof = {int(ID): i for i, ID in enumerate(self.ids)}
+
+        self._data = None
+        self.refresh()
+        return moved
+
+    def diff(self, data):
+        """ Compares the snapshot to a new version of the dataset through the hashes
+        of their installations: only the installations whose hash isn't in the other
+        version are looked at. Returns the IDs of the installations added, changed
+        and removed.
+
+        Parameters
+        ----------
+        data : pandas dataframe
+            Validated and compacted installations, with the columns of the csv.
+        """
+        hashes = row_hashes(data)
+        fresh = data['ID'].to_numpy()[~np.isin(hashes, self.hashes)].astype(int).tolist()
+        stale = set(self.ids[~np.isin(self.hashes, hashes)].tolist()) - set(fresh)
+        return {
+            'added': [ID for ID in fresh if ID not in self.rowof],
+            'changed': sorted(ID for ID in fresh if ID in self.rowof),
+            'removed': sorted(stale),
+        }
+
+    def update(self, data, changes=None):
+        """ Brings the snapshot to a new version of the dataset, recomputing the derived
+        structures for the added, changed and removed installations only. Returns the
+        changes, with the new position of each old position after removals (moved,
+        None without removal), the positions of the changed installations and the
+        slice of the added ones.
+
+        Parameters
+        ----------
+        data : pandas dataframe
+            Validated and compacted installations, with the columns of the csv.
+        changes : dict, optional
+            Changes returned by diff, computed if not given.
+        """
+        if changes is None:
+            changes = self.diff(data)
+        ids = data['ID'].astype(int)
+        moved = self.remove(changes['removed']) if changes['removed'] else None
+        positions = self.replace(data[ids.isin(changes['changed'])]) if changes['changed'] else np.zeros(0, dtype=np.int64)
+        rows = self.extend(data[ids.isin(changes['added'])]) if changes['added'] else slice(self.n, self.n)
+        if changes['added'] or changes['changed'] or changes['removed']:
+            self.commit(changes['added'], changes['changed'], changes['removed'])
+        return dict(changes, moved=moved, positions=positions, rows=rows)
+
+    def commit(self, added, changed, removed):
+        """ Changes the version of the snapshot and records the change in the changelog.
+
+        Parameters
+        ----------
+        added, changed, removed : list
+            IDs of the installations added, changed and removed.
+        """
+        previous = self.version
+        self.version = content_version(self.hashes)
+        self.changelog.append({
+            'version': self.version,
+            'previous': previous,
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'added': list(added),
+            'changed': list(changed),
+            'removed': list(removed),
+        })
+
+    def find_duplicates(self, new):
+        """ Returns the likely duplicates of new installations among the installations
+        of the snapshot and the new installations before them, by position in new.
+        Installations without likely duplicates are left out.
+
+        Parameters
+        ----------
+        new : pandas dataframe
+            Installations, with the columns of the csv.
+        """
+        tags = new[self.tagcols].to_numpy(dtype=np.uint8)
+        records = new[['Name', 'Creator(s)', 'Hyperlink']].to_dict('records')
+        batch = DuplicateIndex(self.duplicates.threshold)
+        signed = [batch.signature(record) for record in records]
+        batch.insert(new['ID'].astype(int).tolist(), signed)
+        found = {}
+        for i, record in enumerate(records):
+            matches = (self.duplicates.query(record, self.tags, tags[i], signed[i])
+                + batch.query(record, tags, tags[i], signed[i], before=i))
+            if matches:
+                found[i] = sorted(matches, key=lambda match: -match['score'])
+        return found
+
+    def select(self, sections, rows=slice(None), years=None):
+        """ Returns a boolean mask of the installations belonging to every section,
+        a section being a tag column or a field.
+
+        Parameters
+        ----------
+        sections : list
+            Tag columns or fields.
+        rows : slice
+            Contiguous range of installations to consider, all of them by default.
+        years : tuple, optional
+            First and last year of the installations to consider.
+        """
+        start, stop, step = rows.indices(self.n)
+        mask = np.ones(stop - start, dtype=bool)
+
+        if years is not None:
+            positions = self.years.between(*years)
+            positions = positions[(positions >= start) & (positions < stop)]
+            mask[:] = False
+            mask[positions - start] = True
+
+        for section in sections:
+            verif = np.zeros(stop - start, dtype=bool)
+            postings = np.asarray(self.fieldrows.get(section, []), dtype=np.int64)
+            postings = postings[(postings >= start) & (postings < stop)]
+            verif[postings - start] = True
+            if section in self.tagindex:
+                verif |= self._tags[start:stop, self.tagindex[section]] == 1
+            elif section in self.segments[0].columns:
+                verif |= (self.take(np.arange(start, stop))[section] == 1).to_numpy()
+            mask &= verif
+
+        return mask
+
+    def fit_embedding(self, method='pca'):
+        """ Fits the 2D projection of the tag vectors. Appended installations
+        are then projected on the fitted axes, without refitting.
+
+        Parameters
+        ----------
+        method : str
+            'pca' or 'mds'.
+        """
+        self.embedding = Embedding(self.tags, method)
+        self._coords = self.embedding.coords.copy()
+
+    def most_similar(self, ID, k=10, metric='jaccard'):
+        """ Returns the IDs and scores of the k installations most similar to an installation,
+        compared to all the others through their packed tag vectors.
+
+        Parameters
+        ----------
+        ID : int
+            ID of the installation.
+        k : int
+            Number of similar installations.
+        metric : str
+            'jaccard' or 'cosine'.
+        """
+        i = self.rowof[ID]
+        positions, scores = top_k(similarities(self.words, self.norms, i, metric), k, exclude=i)
+        return [(int(self.ids[p]), float(score)) for p, score in zip(positions, scores)]
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import re
 
+from apps.schema import SUBJECT_AREAS
+
 
 class appObj:
     """ Compiles and defines arrays for sunburst creations.
@@ -29,6 +31,11 @@ class appObj:
     self.parentslabel : list
         Indicates which category contains subcategories.
         Not used for Field Sunburst.
+    self.leaves : list
+        Tag column of each leaf category, in the order of self.df.
+        Not used for Field Sunburst.
+    self.agg : numpy array
+        Leaf to ancestor aggregation matrix. Not used for Field Sunburst.
     """
     def __init__(self, data, name):
         """ Initializes instance variables.
@@ -50,6 +57,8 @@ class appObj:
         self.df = []
         self.len = 0
         self.parentslabels = []
+        self.leaves = []
+        self.agg = None
         
 
     def initiate_arrays(self):
@@ -168,6 +177,10 @@ class appObj:
                         except IndexError:
                             break
 
+            # Leaf categories and their aggregation towards the ancestors
+            self.leaves = self.df['ids'].tolist()[len(self.IDs):]
+            self.agg = self.aggregation_matrix()
+
         elif self.name == 'Field':
             self.parents = [""]
             self.labels = ["Subject<br>Area"]
@@ -192,6 +205,46 @@ class appObj:
                                     ))
             self.df = self.df.sort_values(by='values', ascending=False)
 
+    def aggregation_matrix(self):
+        """ Builds the matrix mapping every leaf category onto itself and its ancestors,
+        so that the value of each node is the sum of its leaves. Not used for field.
+
+        Returns
+        -------
+        numpy array
+            Array of shape (number of nodes, number of leaves).
+        """
+        ids = self.df['ids'].tolist()
+        parents = dict(zip(ids, self.df['parents']))
+        agg = np.zeros((len(ids), len(self.leaves)), dtype=np.int64)
+        for j, leaf in enumerate(self.leaves):
+            node = leaf
+            while node != "":
+                agg[ids.index(node), j] = 1
+                node = parents[node]
+        return agg
+
+    def descendants(self, node):
+        """ Returns the leaf categories below a node. Not used for field.
+
+        Parameters
+        ----------
+        node : str
+            ID of the node.
+        """
+        row = self.agg[self.df['ids'].tolist().index(node)]
+        return [leaf for leaf, a in zip(self.leaves, row) if a]
+
+    def node_values(self, counts):
+        """ Computes the value of every node from the number of elements of each leaf.
+
+        Parameters
+        ----------
+        counts : pandas series
+            Number of elements for each tag column, indexed by column name.
+        """
+        return self.agg @ counts[self.leaves].to_numpy()
+
     def increment_area(self, str_a, str_f):
         """ Used only for the field sunburst.
         Increments instance labels and parents with Global Subject Area, Subject Area, and Field.
@@ -208,28 +261,12 @@ class appObj:
             return
         if str_f in self.parents:
             raise NameError(str_f + ' is a Subject Area, Not a Field')
-        elif str_a in ['Physical<br>Sciences', 'Health<br>Sciences', 
-            'Social<br>Sciences', 'Life<br>Sciences']:
+        areas = {re.sub(' ', '<br>', area): re.sub(' ', '<br>', parent) for area, parent in SUBJECT_AREAS.items()}
+        if str_a in areas.values():
             raise NameError(str_a + ' is a Global Subject Area, Not an Area')
-
-        phys = ('Computer<br>Science', 'Engineering', 'Mathematics',
-            'Physics<br>and<br>Astronomy', 'Materials<br>Science',
-            'Environmental<br>Science')
-        health = ('Medicine', 'Nursing', 'Health<br>Professions')
-        social = ('Arts<br>and<br>Humanities', 'Decision<br>Sciences', 
-            'Psychology', 'Social<br>Sciences<br>Area')
-        life = ('Neuroscience')
-
-        if str_a in phys:
-            str_p = 'Physical<br>Sciences'
-        elif str_a in health:
-            str_p = 'Health<br>Sciences'
-        elif str_a in social:
-            str_p = 'Social<br>Sciences'
-        elif str_a in life:
-            str_p = 'Life<br>Sciences'
-        else:
+        if str_a not in areas:
             raise NameError(str_a + ' is not in the list for Global Subject Areas')
+        str_p = areas[str_a]
 
         if str_f not in self.labels:
             self.parents.append(str_a)
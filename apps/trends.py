@@ -0,0 +1,218 @@
+import re, threading
+import numpy as np
+
+
+def start_years(years):
+    """ Returns the first year of each installation, -1 when unknown.
+    Years are written as 2015, 2015- (ongoing) or 2015-2017.
+
+    Parameters
+    ----------
+    years : iterable
+        Year column of the installations.
+    """
+    starts = [re.match(r'\s*(\d{4})', str(year)) for year in years]
+    return np.array([int(m.group(1)) if m else -1 for m in starts], dtype=np.int64)
+
+
+class YearIndex:
+    """ Positions of the installations sorted by year, so that the installations
+    of a range of years are found by binary search. Added installations wait in
+    a buffer, merged into the sorted arrays at once when the index is next read.
+
+    Attributes
+    ----------
+    self.years : numpy array
+        Sorted years.
+    self.positions : numpy array
+        Position of the installation of each year in self.years.
+    self.pending : list
+        (positions, years) of the installations added since the last merge.
+    """
+    def __init__(self):
+        """ Initializes an empty index."""
+        self._years = np.zeros(0, dtype=np.int64)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    @property
+    def years(self):
+        self.merge()
+        return self._years
+
+    @property
+    def positions(self):
+        self.merge()
+        return self._positions
+
+    def add(self, positions, years):
+        """ Adds installations to the buffer of the index.
+
+        Parameters
+        ----------
+        positions : numpy array
+            Positions of the installations.
+        years : numpy array
+            Years of the installations.
+        """
+        with self.lock:
+            self.pending.append((positions, years))
+
+    def merge(self):
+        """ Inserts the buffered installations in the sorted arrays with a single
+        insertion, the installations of a same year staying in the order they were added."""
+        with self.lock:
+            if not self.pending:
+                return
+            positions = np.concatenate([batch[0] for batch in self.pending])
+            years = np.concatenate([batch[1] for batch in self.pending])
+            order = np.argsort(years, kind='stable')
+            slots = np.searchsorted(self._years, years[order], side='right')
+            self._years = np.insert(self._years, slots, years[order])
+            self._positions = np.insert(self._positions, slots, positions[order])
+            self.pending = []
+
+    def remove(self, positions):
+        """ Removes installations from the index.
+
+        Parameters
+        ----------
+        positions : numpy array
+            Positions of the installations.
+        """
+        keep = ~np.isin(self.positions, positions)
+        self._years = self._years[keep]
+        self._positions = self._positions[keep]
+
+    def remap(self, moved):
+        """ Moves the installations to new positions after others were removed,
+        the order of the positions being kept.
+
+        Parameters
+        ----------
+        moved : numpy array
+            New position of each old position, -1 for removed installations.
+        """
+        positions = moved[self.positions]
+        keep = positions >= 0
+        self._years = self._years[keep]
+        self._positions = positions[keep]
+
+    def between(self, start, stop):
+        """ Returns the positions of the installations from year start to year stop, included.
+
+        Parameters
+        ----------
+        start : int
+            First year.
+        stop : int
+            Last year.
+        """
+        lo = np.searchsorted(self.years, start, side='left')
+        hi = np.searchsorted(self.years, stop, side='right')
+        return self.positions[lo:hi]
+
+
+class TrendCube:
+    """ Number of installations carrying each tag, by year. Added installations
+    wait in a buffer, summed into the cube at once when it is next read.
+
+    Attributes
+    ----------
+    self.years : numpy array
+        Sorted years, unknown years being left out.
+    self.counts : numpy array
+        Array of shape (number of years, number of tags).
+    self.totals : numpy array
+        Number of installations of each year.
+    self.pending : list
+        (years, tags) of the installations added since the last merge.
+    """
+    def __init__(self, k):
+        """ Initializes an empty cube.
+
+        Parameters
+        ----------
+        k : int
+            Number of tags.
+        """
+        self._years = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros((0, k), dtype=np.int64)
+        self._totals = np.zeros(0, dtype=np.int64)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    @property
+    def years(self):
+        self.merge()
+        return self._years
+
+    @property
+    def counts(self):
+        self.merge()
+        return self._counts
+
+    @property
+    def totals(self):
+        self.merge()
+        return self._totals
+
+    def add(self, years, tags):
+        """ Adds installations to the buffer of the cube.
+
+        Parameters
+        ----------
+        years : numpy array
+            Years of the installations.
+        tags : numpy array
+            Binary array of shape (number of installations, number of tags).
+        """
+        with self.lock:
+            self.pending.append((years, tags))
+
+    def merge(self):
+        """ Adds the buffered installations to the cube with a single grouped sum over their tags."""
+        with self.lock:
+            if not self.pending:
+                return
+            years = np.concatenate([batch[0] for batch in self.pending])
+            tags = np.concatenate([batch[1] for batch in self.pending])
+            self.pending = []
+            known = years >= 0
+            years, tags = years[known], tags[known]
+            missing = np.setdiff1d(years, self._years)
+            if len(missing):
+                slots = np.searchsorted(self._years, missing)
+                self._years = np.insert(self._years, slots, missing)
+                self._counts = np.insert(self._counts, slots, 0, axis=0)
+                self._totals = np.insert(self._totals, slots, 0)
+
+            rows = np.searchsorted(self._years, years)
+            np.add.at(self._counts, rows, tags.astype(np.int64))
+            np.add.at(self._totals, rows, 1)
+
+    def remove(self, years, tags):
+        """ Removes installations from the cube, their years being kept.
+
+        Parameters
+        ----------
+        years : numpy array
+            Years of the installations.
+        tags : numpy array
+            Binary array of shape (number of installations, number of tags).
+        """
+        known = years >= 0
+        rows = np.searchsorted(self.years, years[known])
+        np.subtract.at(self._counts, rows, tags[known].astype(np.int64))
+        np.subtract.at(self._totals, rows, 1)
+
+    def shares(self, j):
+        """ Returns the share of the installations of each year carrying a tag.
+
+        Parameters
+        ----------
+        j : int
+            Column of the tag.
+        """
+        return self.counts[:, j] / np.maximum(self.totals, 1)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def pack_signatures(tags):
+    """ Encodes the tags of each installation as a packed integer signature,
+    bit j being set when the installation carries the j-th tag.
+    Up to 64 tags are packed in a single unsigned integer, larger groups
+    are packed in fixed-size byte strings.
+
+    Parameters
+    ----------
+    tags : numpy array
+        Binary array of shape (number of installations, number of tags).
+    """
+    packed = np.packbits(tags.astype(bool), axis=1, bitorder='little')
+    if tags.shape[1] <= 64:
+        padded = np.zeros((len(packed), 8), dtype=np.uint8)
+        padded[:, :packed.shape[1]] = packed
+        return padded.view('<u8').ravel()
+    return np.ascontiguousarray(packed).view(np.dtype((np.void, packed.shape[1]))).ravel()
+
+def unpack_signature(signature, k):
+    """ Decodes a signature into the indices of the tags it contains.
+
+    Parameters
+    ----------
+    signature : int or bytes
+        Signature produced by pack_signatures.
+    k : int
+        Number of tags in the group.
+    """
+    if isinstance(signature, (int, np.integer)):
+        raw = np.array([signature], dtype='<u8').view(np.uint8)
+    else:
+        raw = np.frombuffer(bytes(signature), dtype=np.uint8)
+    bits = np.unpackbits(raw, bitorder='little')[:k]
+    return np.flatnonzero(bits).tolist()
+
+def intersection_counts(tags, cols, mask=None):
+    """ Computes the exact size of every non-empty intersection of a group of tags,
+    i.e. the number of installations carrying exactly a given combination of tags.
+    Only the combinations present in the data are materialized, so that
+    the cost depends on the number of installations rather than on 2^k.
+
+    Parameters
+    ----------
+    tags : numpy array
+        Binary array of shape (number of installations, number of tags in the group).
+    cols : list
+        Tag column of each column of tags.
+    mask : numpy array, optional
+        Boolean mask of the installations to consider.
+
+    Returns
+    -------
+    list
+        (tuple of tag columns, number of installations) pairs,
+        sorted by decreasing number of installations.
+        Installations carrying none of the tags are left out.
+    """
+    if mask is not None:
+        tags = tags[mask]
+    signatures, counts = np.unique(pack_signatures(tags), return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+
+    intersections = []
+    for i in order:
+        members = unpack_signature(signatures[i], len(cols))
+        if members:
+            intersections.append((tuple(cols[j] for j in members), int(counts[i])))
+    return intersections
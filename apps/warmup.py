@@ -0,0 +1,222 @@
+import os, time, threading
+from collections import Counter
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers of the log aren't serialized
+    fcntl = None
+
+""" Warm-up of the application after startup, and log of the selections
+replayed by it. The selections are counted in memory, the counts of the most
+frequent ones being kept, and added to the log from the warm-up thread,
+one count and canonical query string per line. The workers of a server
+share the log, each one adding its own counts to the ones on disk."""
+
+
+def read_counts(path):
+    """ Returns the counts of the selections of a log, as a Counter by query string.
+    Lines holding a query string only (older logs) count once.
+
+    Parameters
+    ----------
+    path : str
+        Path of the log.
+    """
+    counts = Counter()
+    if not path or not os.path.exists(path):
+        return counts
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            count, _, query = line.strip().rpartition('\t')
+            if query:
+                counts[query] += int(count) if count.isdigit() else 1
+    return counts
+
+def most_common(counts, size):
+    """ Returns the counts of the size most frequent selections once there are
+    more than twice as many, else the counts unchanged.
+
+    Parameters
+    ----------
+    counts : Counter
+        Counts by query string.
+    size : int
+        Number of selections kept.
+    """
+    if len(counts) > 2 * size:
+        return Counter(dict(counts.most_common(size)))
+    return counts
+
+
+class SelectionLog:
+    """ Counts of the selections made by the users, bounded in size.
+
+    Attributes
+    ----------
+    self.path : str
+        Path of the log, nothing is recorded if empty.
+    self.size : int
+        Number of distinct selections kept: beyond twice as many,
+        only the most frequent ones are kept.
+    self.counts : Counter
+        Number of times each selection was made, in the log and since.
+    self.pending : Counter
+        Number of times each selection was made since the last write.
+    """
+    def __init__(self, path, size):
+        """ Reads the counts of the log.
+
+        Parameters
+        ----------
+        path : str
+            Path of the log.
+        size : int
+            Number of distinct selections kept.
+        """
+        self.path = path
+        self.size = size
+        self.counts = most_common(read_counts(path), size)
+        self.pending = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, query):
+        """ Counts a selection.
+
+        Parameters
+        ----------
+        query : str
+            Canonical query string of the selection.
+        """
+        if not self.path:
+            return
+        with self.lock:
+            self.counts[query] += 1
+            self.pending[query] += 1
+            self.counts = most_common(self.counts, self.size)
+            self.pending = most_common(self.pending, self.size)
+
+    def top(self, n):
+        """ Returns the n most frequent selections, most frequent first.
+
+        Parameters
+        ----------
+        n : int
+            Number of selections.
+        """
+        with self.lock:
+            return [query for query, count in self.counts.most_common(n)]
+
+    def write(self):
+        """ Adds the counts recorded since the last write to the ones of the log, which
+        other workers may have updated meanwhile. The log is locked while it is read and
+        written, and written under a temporary name then renamed."""
+        with self.lock:
+            if not self.path or not self.pending:
+                return
+            pending, self.pending = self.pending, Counter()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        try:
+            with open(self.path + '.lock', 'w') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                counts = read_counts(self.path) + pending
+                temporary = '{}.{}.tmp'.format(self.path, os.getpid())
+                with open(temporary, 'w', encoding='utf-8') as log:
+                    log.writelines('{}\t{}\n'.format(count, query) for query, count in counts.most_common(self.size))
+                os.replace(temporary, self.path)
+        except OSError:
+            with self.lock:
+                self.pending.update(pending)
+            raise
+        with self.lock:
+            self.counts = most_common(counts + self.pending, self.size)
+
+
+class WarmUp:
+    """ Runs the warm-up steps and reports whether the application is ready.
+
+    Attributes
+    ----------
+    self.started : float
+        Time the warm-up started, None if not started.
+    self.duration : float
+        Duration of the warm-up in seconds, None until it is done.
+    self.steps : dict
+        Duration of each step in seconds.
+    self.error : str
+        Error raised by a step, None if every step succeeded.
+    """
+    def __init__(self):
+        """ Initializes a warm-up not started yet."""
+        self.started = None
+        self.duration = None
+        self.steps = {}
+        self.error = None
+
+    @property
+    def ready(self):
+        return self.duration is not None
+
+    def run(self, steps):
+        """ Runs the steps in order. A failing step is reported but doesn't
+        prevent the application from becoming ready, its caches being filled on demand.
+
+        Parameters
+        ----------
+        steps : list
+            (name, function) of each step.
+        """
+        self.started = time.perf_counter()
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.error = name + ': ' + repr(e)
+            self.steps[name] = time.perf_counter() - start
+        self.duration = time.perf_counter() - self.started
+
+    def repeat(self, task, interval):
+        """ Runs a task periodically, e.g. writing the selection log, once the steps are done.
+
+        Parameters
+        ----------
+        task : function
+        interval : float
+            Interval in seconds between runs.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                task()
+            except Exception as e:
+                self.error = 'periodic: ' + repr(e)
+
+    def start(self, steps, task=None, interval=60):
+        """ Runs the steps in a background thread, so that the server answers meanwhile,
+        then the periodic task if any.
+
+        Parameters
+        ----------
+        steps : list
+            (name, function) of each step.
+        task : function, optional
+            Task run periodically afterwards.
+        interval : float
+            Interval in seconds between runs of the task.
+        """
+        def target():
+            self.run(steps)
+            if task is not None and interval > 0:
+                self.repeat(task, interval)
+        thread = threading.Thread(target=target, name='warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        """ Returns the readiness, the duration of the warm-up and of each step."""
+        return {
+            'ready': self.ready,
+            'warmup_seconds': self.duration,
+            'steps': dict(self.steps),
+            'error': self.error,
+        }
@@ -0,0 +1,367 @@
+import re, json, time, random, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+from apps.warmup import read_counts
+
+"""
+Load generator for a locally running app (e.g. gunicorn app:server).
+Replays user sessions as the browser would: page loads, radio switches,
+sunburst clicks and multi-select dropdowns, sent as /_dash-update-component
+requests, then reports throughput, latency percentiles and error rates per callback.
+
+Example: python loadtest.py --url http://127.0.0.1:8000 --concurrency 8 --sessions 200
+Sessions start from the selections of an access log with --log, drawn
+in proportion to the number of times they were made.
+"""
+
+""" Weights of the actions drawn by the session model."""
+ACTIONS = {'radio': 3, 'click': 4, 'dropdown': 4, 'clear': 1, 'page': 1}
+PAGES = ['/trends', '/map', '/glossary', '/intersections']
+
+
+class Stats:
+    """ Latencies and errors of the requests, by callback.
+
+    Attributes
+    ----------
+    self.latencies : dict
+        Latencies in seconds, by callback.
+    self.errors : dict
+        Number of failed requests, by callback.
+    """
+    def __init__(self):
+        """ Initializes empty statistics."""
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, latency, ok):
+        """ Records a request.
+
+        Parameters
+        ----------
+        name : str
+            Callback, named by its first output.
+        latency : float
+            Duration of the request in seconds.
+        ok : bool
+            Whether the request succeeded.
+        """
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, duration):
+        """ Returns the throughput, and the count, error rate and latency
+        percentiles (in ms) of each callback.
+
+        Parameters
+        ----------
+        duration : float
+            Duration of the test in seconds.
+        """
+        callbacks = {}
+        for name, latencies in sorted(self.latencies.items()):
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            callbacks[name] = {'requests': len(latencies), 'error_rate': self.errors.get(name, 0) / len(latencies),
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {'duration_s': duration, 'requests': total, 'throughput_rps': total / duration if duration else 0.0,
+            'errors': sum(self.errors.values()), 'callbacks': callbacks}
+
+
+def parse_outputs(output):
+    """ Splits the output string of a dependency into (id, property) pairs.
+
+    Parameters
+    ----------
+    output : str
+        Output of the dependency, e.g. 'url.search' or '..a.b...c.d..'.
+    """
+    outputs = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(o.rsplit('.', 1)) for o in outputs]
+
+def collect_props(component, props):
+    """ Collects the properties of the components having a string id in a layout.
+
+    Parameters
+    ----------
+    component : dict or list
+        Serialized layout.
+    props : dict
+        Values by (id, property), filled in place.
+    """
+    if isinstance(component, list):
+        for child in component:
+            collect_props(child, props)
+    elif isinstance(component, dict) and 'props' in component:
+        ID = component['props'].get('id')
+        for prop, value in component['props'].items():
+            if isinstance(ID, str):
+                props[(ID, prop)] = value
+            if prop == 'children':
+                collect_props(value, props)
+
+
+class Session:
+    """ Emulates the Dash renderer of one user: keeps the properties of the
+    components of the current page and fires the callbacks their changes trigger.
+    Pattern-matching and background callbacks are left out.
+
+    Attributes
+    ----------
+    self.url : str
+        Url of the app.
+    self.deps : list
+        Callback dependencies of the app, from /_dash-dependencies.
+    self.stats : Stats
+        Where requests are recorded.
+    self.http : requests.Session
+        Connection reused by the requests of the session.
+    self.props : dict
+        Values by (id, property) of the components of the current page.
+    self.page : set
+        IDs of the components of the current page layout.
+    self.end_id : str
+        Token of the page load, sent with every request as the renderer does.
+    """
+    def __init__(self, url, deps, stats):
+        """ Initializes a session without page.
+
+        Parameters
+        ----------
+        url : str
+            Url of the app.
+        deps : list
+            Callback dependencies of the app.
+        stats : Stats
+            Where requests are recorded.
+        """
+        self.url = url
+        self.deps = deps
+        self.stats = stats
+        self.http = requests.Session()
+        self.props = {}
+        self.page = set()
+        self.end_id = None
+
+    def load_config(self):
+        """ Loads the index page and reads the token the renderer sends back with each request."""
+        page = self.http.get(self.url + '/', timeout=60).text
+        match = re.search(r'<script id="_dash-config" type="application/json">(.*?)</script>', page, re.S)
+        self.end_id = json.loads(match.group(1)).get('end_id') if match else None
+
+    def call(self, dep, changed):
+        """ Sends the request of a callback and applies its response.
+        Returns the properties it changed.
+
+        Parameters
+        ----------
+        dep : dict
+            Dependency of the callback.
+        changed : list
+            (id, property) that triggered the callback.
+        """
+        outputs = parse_outputs(dep['output'])
+        body = {
+            'output': dep['output'],
+            'outputs': [{'id': ID, 'property': prop} for ID, prop in outputs],
+            'inputs': [{'id': i['id'], 'property': i['property'], 'value': self.props.get((i['id'], i['property']))}
+                for i in dep['inputs']],
+            'state': [{'id': s['id'], 'property': s['property'], 'value': self.props.get((s['id'], s['property']))}
+                for s in dep['state']],
+            'changedPropIds': [ID + '.' + prop for ID, prop in changed],
+        }
+        if len(outputs) == 1:
+            body['outputs'] = body['outputs'][0]
+
+        name = outputs[0][0] + '.' + outputs[0][1]
+        start = time.perf_counter()
+        try:
+            response = self.http.post(self.url + '/_dash-update-component', json=body, timeout=60,
+                params={'endId': self.end_id} if self.end_id else None)
+            ok = response.status_code in (200, 204)
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(name, time.perf_counter() - start, ok)
+        if not ok or response.status_code == 204:
+            return []
+
+        updated = []
+        for ID, values in response.json().get('response', {}).items():
+            for prop, value in values.items():
+                self.props[(ID, prop)] = value
+                updated.append((ID, prop))
+        return updated
+
+    def available(self, dep):
+        """ Whether every input of a callback is on the current page."""
+        ids = {ID for ID, prop in self.props}
+        return all(isinstance(i['id'], str) and i['id'] in ids for i in dep['inputs']) and not dep.get('background')
+
+    def fire(self, changed, initial=False):
+        """ Fires the callbacks triggered by changed properties, then the ones
+        triggered by their outputs, as the renderer does.
+
+        Parameters
+        ----------
+        changed : list
+            (id, property) changed.
+        initial : bool
+            Whether the page was just loaded, firing every callback
+            whose initial call isn't prevented.
+        """
+        changed = list(changed)
+        for depth in range(10):
+            if not changed and not initial:
+                return
+            triggered = []
+            for dep in self.deps:
+                if not self.available(dep):
+                    continue
+                inputs = [(i['id'], i['property']) for i in dep['inputs']]
+                cause = [prop for prop in changed if prop in inputs]
+                fresh = initial and not dep.get('prevent_initial_call') and any(ID in self.page for ID, prop in inputs)
+                if cause or fresh:
+                    triggered.append((dep, cause))
+            initial = False
+            changed = []
+            for dep, cause in triggered:
+                updated = self.call(dep, cause)
+                if ('page_content', 'children') in updated:
+                    self.load_layout(self.props[('page_content', 'children')])
+                    return self.fire([], initial=True)
+                changed += updated
+
+    def load_layout(self, layout):
+        """ Replaces the components of the page by the ones of a new layout.
+
+        Parameters
+        ----------
+        layout : dict
+            Serialized layout of the page.
+        """
+        self.props = {key: value for key, value in self.props.items() if key[0] in ('url', 'page_content')}
+        props = {}
+        collect_props(layout, props)
+        self.props.update(props)
+        self.page = {ID for ID, prop in props}
+
+    def visit(self, pathname, search=''):
+        """ Loads a page.
+
+        Parameters
+        ----------
+        pathname : str
+            Path of the page.
+        search : str
+            Query string of the url.
+        """
+        self.props = {('url', 'pathname'): pathname, ('url', 'search'): search,
+            ('page_content', 'children'): None}
+        self.fire([('url', 'pathname')])
+
+    def act(self, action, rng):
+        """ Performs an action of the session model on the main page.
+
+        Parameters
+        ----------
+        action : str
+            'radio', 'click', 'dropdown', 'clear' or 'page'.
+        rng : random.Random
+            Random generator of the session.
+        """
+        if action == 'page' or ('select_plot', 'value') not in self.props:
+            return self.visit('/' if ('select_plot', 'value') not in self.props else rng.choice(PAGES))
+        if action == 'radio':
+            current = self.props[('select_plot', 'value')]
+            self.props[('select_plot', 'value')] = rng.choice([d for d in ('AI', 'IN', 'SD') if d != current])
+            return self.fire([('select_plot', 'value')])
+        if action == 'click':
+            figure = self.props.get(('sunburst', 'figure')) or {}
+            trace = (figure.get('data') or [{}])[0]
+            ids, labels = trace.get('ids') or [], trace.get('labels') or []
+            if not ids:
+                return None
+            i = rng.randrange(len(ids))
+            self.props[('sunburst', 'clickData')] = {'points': [{'id': ids[i], 'label': labels[i]}]}
+            return self.fire([('sunburst', 'clickData')])
+        if action == 'dropdown':
+            options = self.props.get(('dropdown_cat', 'options')) or []
+            values = [o['value'] for o in rng.sample(options, min(len(options), rng.randint(1, 3)))]
+            self.props[('dropdown_cat', 'value')] = values
+            return self.fire([('dropdown_cat', 'value')])
+        if action == 'clear':
+            self.props[('dropdown_cat', 'value')] = []
+            return self.fire([('dropdown_cat', 'value')])
+
+
+def run_session(url, deps, stats, rng, actions, searches, think):
+    """ Runs a session: loads the main page, with a recorded selection when
+    given, then performs random actions.
+
+    Parameters
+    ----------
+    url : str
+        Url of the app.
+    deps : list
+        Callback dependencies of the app.
+    stats : Stats
+        Where requests are recorded.
+    rng : random.Random
+        Random generator of the session.
+    actions : int
+        Number of actions after the page load.
+    searches : dict
+        Number of times each recorded selection was made, by query string,
+        a selection being drawn for the page load in proportion to it.
+    think : float
+        Pause between actions in seconds.
+    """
+    session = Session(url, deps, stats)
+    session.load_config()
+    session.visit('/', rng.choices(list(searches), list(searches.values()))[0] if searches else '')
+    names, weights = zip(*ACTIONS.items())
+    for i in range(actions):
+        time.sleep(think)
+        session.act(rng.choices(names, weights)[0], rng)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays user sessions against a running app.')
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='url of the app')
+    parser.add_argument('--concurrency', type=int, default=4, help='number of simultaneous sessions')
+    parser.add_argument('--sessions', type=int, default=50, help='number of sessions')
+    parser.add_argument('--actions', type=int, default=10, help='number of actions per session')
+    parser.add_argument('--think', type=float, default=0.0, help='pause between actions, in seconds')
+    parser.add_argument('--log', help='access log of recorded selections, one count and query string per line')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the session model')
+    parser.add_argument('--json', help='file where the report is written as json')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    deps = requests.get(url + '/_dash-dependencies', timeout=60).json()
+    searches = read_counts(args.log) if args.log else {}
+
+    stats = Stats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        futures = [pool.submit(run_session, url, deps, stats, random.Random(args.seed + i),
+            args.actions, searches, args.think) for i in range(args.sessions)]
+        for future in futures:
+            future.result()
+    report = stats.report(time.perf_counter() - start)
+
+    print('{requests} requests in {duration_s:.1f} s: {throughput_rps:.1f} requests/s, {errors} errors'.format(**report))
+    print('{:<45} {:>8} {:>7} {:>9} {:>9} {:>9}'.format('callback', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for name, c in report['callbacks'].items():
+        print('{:<45} {:>8} {:>6.1%} {:>9.1f} {:>9.1f} {:>9.1f}'.format(name[:45], c['requests'], c['error_rate'],
+            c['p50_ms'], c['p95_ms'], c['p99_ms']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
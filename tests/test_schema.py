@@ -0,0 +1,12 @@
+from apps.schema import subject_error
+
+
+def test_subject_error():
+    """ Subject areas and fields are accepted only when the Field sunburst can place them."""
+    assert subject_error('Arts and Humanities', 'Music') is None
+    assert subject_error('Computer Science; Engineering', 'Human-Computer Interaction; Acoustics') is None
+    assert subject_error(float('nan'), float('nan')) is None
+    assert 'must be one of' in subject_error('Arts', 'Music')
+    assert 'must be one of' in subject_error('Social Sciences', 'Music')
+    assert 'area of each field' in subject_error('Engineering', 'Acoustics; Music')
+    assert 'not a subject area' in subject_error('Engineering', 'Mathematics')
@@ -0,0 +1,43 @@
+import random
+
+from apps.warmup import SelectionLog, read_counts
+
+
+def test_selection_log_round_trip(tmp_path):
+    """ Counts written by the workers sharing a log add up, and are read back
+    as query strings, as by the warm-up and the load generator."""
+    path = str(tmp_path / 'access.log')
+    workers = [SelectionLog(path, 10), SelectionLog(path, 10)]
+    for i in range(3):
+        workers[0].record('?dim=AI&category=Outdoor')
+    workers[1].record('?dim=AI&category=Outdoor')
+    workers[1].record('?dim=SD')
+    for worker in workers:
+        worker.write()
+
+    counts = read_counts(path)
+    assert counts == {'?dim=AI&category=Outdoor': 4, '?dim=SD': 1}
+    assert SelectionLog(path, 10).top(1) == ['?dim=AI&category=Outdoor']
+    assert random.Random(0).choices(list(counts), list(counts.values()))[0] in counts
+
+    workers[0].write()  # nothing recorded since the last write
+    assert read_counts(path) == counts
+
+def test_selection_log_bounded(tmp_path):
+    """ Only the most frequent selections are kept in memory and in the log."""
+    path = str(tmp_path / 'access.log')
+    log = SelectionLog(path, 2)
+    for i in range(3):
+        log.record('?dim=IN')
+    for i in range(10):
+        log.record('?dim=AI&category={}'.format(i))
+    assert len(log.counts) <= 4
+    log.write()
+    assert len(read_counts(path)) <= 2
+    assert log.top(1) == ['?dim=IN']
+
+def test_read_counts_older_log(tmp_path):
+    """ Logs holding one query string per line count each line once."""
+    path = tmp_path / 'access.log'
+    path.write_text('?dim=AI\n?dim=AI\n?dim=SD\n', encoding='utf-8')
+    assert read_counts(str(path)) == {'?dim=AI': 2, '?dim=SD': 1}